@@ -0,0 +1,72 @@
+"""
+Response size and CPU cost of compressing the catalog lists.
+
+Seeds a throwaway database and, for GET /characters and GET /planets, reports
+the body size of each encoding and the median in-process CPU time per request:
+uncompressed, compressed on every request (response cache off) and served
+from the cache with the compressed body stored next to the entry (cache on).
+
+    $ python benchmarks/compression.py --characters 5000 --planets 1000 --repeat 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed, add_volume_arguments  # noqa: E402
+
+def cpu_time(client, path, headers, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        response = client.get(path, headers=headers)
+        samples.append(time.process_time() - start)
+        assert response.status_code == 200, (path, response.status_code)
+    return round(statistics.median(samples) * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'bench.db')
+    volumes = seed(database_url, args.users, args.characters, args.planets, args.vehicles, 0)
+    os.environ.update(DATABASE_URL=database_url, CACHE_ENABLED='1', COMPRESSION_ENABLED='1')
+
+    from app import create_app
+    from cache import response_cache
+    from compression import ENCODERS
+    app = create_app(features=())
+    client = app.test_client()
+
+    report = {"config": {"database": database_url.split('://')[0], "repeat": args.repeat, "volumes": volumes}, "results": {}}
+    for path in ('/characters', '/planets'):
+        result = {}
+        for encoding in ('identity',) + tuple(ENCODERS):
+            headers = {'Accept-Encoding': encoding}
+            size = len(client.get(path, headers=headers).data)
+            response_cache.enabled = False
+            per_request = cpu_time(client, path, headers, args.repeat)
+            response_cache.enabled = True
+            cached = cpu_time(client, path, headers, args.repeat)
+            result[encoding] = {"bytes": size, "uncached_ms": per_request, "cached_ms": cached}
+        report["results"][path] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
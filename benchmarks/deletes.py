@@ -0,0 +1,124 @@
+"""
+Delete latency: ORM unit-of-work deletes versus set-based deletes with ON DELETE CASCADE.
+
+Seeds a database where one character is favorited by every user and one user
+has favorited every character, then times three deletes two ways on a fresh
+copy of the data each run:
+
+    orm         load the object and its favorites, session.delete() each one (before)
+    set_based   delete_items(): one DELETE ... WHERE id IN (...), favorites removed
+                by the database cascade, counters adjusted with one UPDATE per kind (after)
+
+    popular_character   DELETE /character/1 (favorited by --users users)
+    heavy_user          DELETE /user/1 (--characters favorites)
+    bulk_characters     DELETE /characters with --bulk ids
+
+    $ python benchmarks/deletes.py --users 100000 --characters 20000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed  # noqa: E402
+
+def seed_popular(database_url, users, characters):
+    seed(database_url, users=users, characters=characters, planets=0, vehicles=0, favorites=0)
+    from sqlalchemy import create_engine, text
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        # EL PERSONAJE 1 ES FAVORITO DE TODOS LOS USUARIOS Y EL USUARIO 1 TIENE TODOS LOS PERSONAJES
+        connection.execute(text('INSERT INTO favorite (user_id, character_id) SELECT id, 1 FROM "user"'))
+        connection.execute(text('INSERT INTO favorite (user_id, character_id) SELECT 1, id FROM character WHERE id > 1'))
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file (copied for every run)')
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--characters', type=int, default=10000)
+    parser.add_argument('--bulk', type=int, default=1000, help='ids deleted by bulk_characters')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    template = None
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        directory = tempfile.mkdtemp()
+        template = os.path.join(directory, 'template.db')
+        database_url = 'sqlite:///' + os.path.join(directory, 'bench.db')
+        seed_popular('sqlite:///' + template, args.users, args.characters)
+
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from models import db, User, Character, FavoriteCount
+    from bulk import delete_items
+    from upsert import add_favorite_count
+    app = create_app(features=())
+
+    # LA COLECCION DE FAVORITOS SE CARGA COMPLETA Y EL UNIT OF WORK BORRA CADA FAVORITO
+    # (passive_deletes SOLO EVITA CARGARLA, LOS FAVORITOS YA CARGADOS SE BORRAN UNO A UNO)
+    def orm(model, ids):
+        for item_id in ids:
+            item = db.session.get(model, item_id)
+            for favorite in (item.favorites if model is User else item.favorite):
+                if model is User:
+                    add_favorite_count('character', favorite.character_id, -1)
+            db.session.delete(item)
+            if model is Character:
+                FavoriteCount.query.filter_by(kind='character', item_id=item_id).delete()
+        db.session.commit()
+
+    def set_based(model, ids):
+        delete_items(model, ids)
+        db.session.commit()
+
+    scenarios = {
+        "popular_character": (Character, [1]),
+        "heavy_user": (User, [1]),
+        "bulk_characters": (Character, list(range(1, args.bulk + 1))),
+    }
+
+    def reset():
+        db.session.remove()
+        db.engine.dispose()
+        if template:
+            shutil.copyfile(template, database_url[len('sqlite:///'):])
+        else:
+            seed_popular(database_url, args.users, args.characters)
+        FavoriteCount.rebuild()
+        db.session.commit()
+
+    report = {"config": {"database": database_url.split('://')[0], "users": args.users, "characters": args.characters,
+                         "bulk": args.bulk, "runs": args.runs}, "results": {}}
+    with app.app_context():
+        for name, (model, ids) in scenarios.items():
+            result = {}
+            for label, delete in (("orm", orm), ("set_based", set_based)):
+                samples = []
+                for _ in range(args.runs):
+                    reset()
+                    start = time.perf_counter()
+                    delete(model, ids)
+                    samples.append(time.perf_counter() - start)
+                result[f'{label}_ms'] = round(statistics.median(samples) * 1000, 1)
+            result["speedup"] = round(result["orm_ms"] / result["set_based_ms"], 1) if result["set_based_ms"] else None
+            report["results"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Favorite lookup latency with and without the favorite indexes.
+
+Seeds a throwaway SQLite database with FAVORITES rows (default 1M), times the
+queries the favorite handlers run, then creates the indexes declared on
+Favorite and times them again.
+
+    $ python benchmarks/favorite_lookup.py --favorites 1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from models import db, Favorite  # noqa: E402
+
+QUERIES = {
+    # Favorite.query.filter_by(user_id=..., character_id=...).first()
+    "favorite_by_user_and_character": "SELECT id FROM favorite WHERE user_id = :user_id AND character_id = :item_id LIMIT 1",
+    "favorite_by_user_and_planet": "SELECT id FROM favorite WHERE user_id = :user_id AND planet_id = :item_id LIMIT 1",
+    # user.favorites
+    "favorites_of_user": "SELECT id, character_id, planet_id, vehicle_id FROM favorite WHERE user_id = :user_id",
+}
+
+def seed(engine, users, items, favorites):
+    db.metadata.create_all(engine, tables=[db.metadata.tables[name] for name in ('user', 'character', 'planet', 'vehicle', 'favorite')])
+    with engine.begin() as connection:
+        for index in Favorite.__table__.indexes:
+            connection.execute(text(f'DROP INDEX {index.name}'))
+        rng = random.Random(42)
+        rows, seen = [], set()
+        while len(seen) < favorites:
+            column = rng.choice(('character_id', 'planet_id', 'vehicle_id'))
+            key = (rng.randint(1, users), column, rng.randint(1, items))
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append({"user_id": key[0], "character_id": None, "planet_id": None, "vehicle_id": None, column: key[2]})
+            if len(rows) == 50000:
+                connection.execute(Favorite.__table__.insert(), rows)
+                rows = []
+        if rows:
+            connection.execute(Favorite.__table__.insert(), rows)
+
+def measure(engine, users, items, samples):
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            statement = text(sql)
+            timings = []
+            for _ in range(samples):
+                params = {"user_id": rng.randint(1, users), "item_id": rng.randint(1, items)}
+                start = time.perf_counter()
+                connection.execute(statement, params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                "p50_ms": round(timings[len(timings) // 2], 4),
+                "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 4),
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--favorites', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'favorite_lookup.db')
+    engine = create_engine(f'sqlite:///{path}')
+    seed(engine, args.users, args.items, args.favorites)
+
+    before = measure(engine, args.users, args.items, args.samples)
+    for index in Favorite.__table__.indexes:
+        index.create(engine)
+    after = measure(engine, args.users, args.items, args.samples)
+
+    print(json.dumps({"favorites": args.favorites, "before": before, "after": after}, indent=2))
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
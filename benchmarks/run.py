@@ -0,0 +1,322 @@
+"""
+API benchmark suite.
+
+Seeds a fresh database, drives every API route of src/app.py (reads with
+paging, filters, sort, fields, ?ids= and ?include=, search, the change feed,
+the top lists, metrics, single and bulk writes and deletes; not the admin
+pages) through the Flask test client and (optionally) through a real gunicorn `wsgi:application`
+process with a concurrent load generator, and prints per-route p50/p99
+latency, throughput and SQL query counts as JSON so runs can be diffed.
+
+    $ python benchmarks/run.py --requests 200 --gunicorn --workers 4 --concurrency 16 --output before.json
+
+Query counts are read from the Server-Timing header the app emits. The rows
+removed by the DELETE routes are seeded apart ("victims", each user with one
+favorite of each kind) so they always exist and their favorites are deleted too.
+Use --database-url with a Postgres URL to benchmark against Postgres; the
+database is dropped and re-created by the seeding step.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import contextlib
+import tempfile
+import platform
+import subprocess
+import http.client
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCHMARKS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from seed import seed, add_volume_arguments, batched_insert  # noqa: E402
+from models import User, Character, Planet, Vehicle, Favorite, FavoriteCount  # noqa: E402
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+BULK_DELETE_SIZE = 10
+VICTIM_MODELS = {'user': User, 'character': Character, 'planet': Planet, 'vehicle': Vehicle}
+
+# FILAS QUE SOLO USAN LOS ESCENARIOS DE BORRADO (count POR TABLA): EL USUARIO VICTIMA i TIENE
+# DE FAVORITOS EL PERSONAJE, EL PLANETA Y EL VEHICULO VICTIMA i, ASI CADA BORRADO ARRASTRA SUS FAVORITOS
+def seed_victims(database_url, count):
+    engine = create_engine(database_url)
+    ids = {}
+    with engine.begin() as connection:
+        batched_insert(connection, User.__table__, (
+            {"name": f'victim {i}', "last_name": 'victim', "email": f'victim{i}@bench.test', "password": 'secret', "subscription_date": date(2024, 1, 1)}
+            for i in range(count)
+        ))
+        batched_insert(connection, Character.__table__, (character_payload(f'victim character {i}') for i in range(count)))
+        batched_insert(connection, Planet.__table__, (planet_payload(f'victim planet {i}') for i in range(count)))
+        batched_insert(connection, Vehicle.__table__, (vehicle_payload(f'victim vehicle {i}') for i in range(count)))
+        for table, model in VICTIM_MODELS.items():
+            column = model.last_name if model is User else model.name
+            ids[table] = [row[0] for row in connection.execute(select(model.id).where(column.like('victim%')).order_by(model.id))]
+
+        batched_insert(connection, Favorite.__table__, (
+            {"user_id": user_id, "character_id": None, "planet_id": None, "vehicle_id": None, column: ids[kind][i]}
+            for i, user_id in enumerate(ids['user'])
+            for kind, column in FavoriteCount.KINDS.items()
+        ))
+        batched_insert(connection, FavoriteCount.__table__, (
+            {"kind": kind, "item_id": item_id, "favorites": 1}
+            for kind in FavoriteCount.KINDS
+            for item_id in ids[kind]
+        ))
+    engine.dispose()
+    return ids
+
+def character_payload(name):
+    return {"name": name, "birth_year": '19BBY', "gender": 'male', "height": '172', "eye_color": 'blue', "skin_color": 'fair', "image": 'https://example.test/c.jpg'}
+
+def planet_payload(name):
+    return {"name": name, "climate": 'arid', "population": '200000', "orbital_period": '304', "rotation_period": '23', "diameter": '10465', "image": 'https://example.test/p.jpg'}
+
+def vehicle_payload(name):
+    return {"name": name, "model": 'T-16', "size": '10'}
+
+# CADA ESCENARIO DEVUELVE (metodo, ruta, cuerpo) PARA LA PETICION NUMERO i
+def build_scenarios(volumes, victims, run_id, reads_only=False):
+    rng = random.Random(1)
+
+    def pick(name):
+        return rng.randint(1, max(volumes[name], 1))
+
+    def pop(table, count=1):
+        ids = victims[table][-count:]
+        del victims[table][-count:]
+        return ids
+
+    def some(name, count=20):
+        return ','.join(str(pick(name)) for _ in range(count))
+
+    scenarios = [
+        ('sitemap', lambda i: ('GET', '/', None)),
+        ('handle_hello', lambda i: ('GET', '/user', None)),
+        ('get_users', lambda i: ('GET', '/users', None)),
+        ('get_users_page', lambda i: ('GET', f'/users?limit=50&after={pick("users") - 1}', None)),
+        ('get_one_user', lambda i: ('GET', f'/user/{pick("users")}', None)),
+        ('get_one_user_include', lambda i: ('GET', f'/user/{pick("users")}?include=favorites.character,favorites.planet,favorites.vehicle', None)),
+        ('get_characters', lambda i: ('GET', '/characters', None)),
+        ('get_characters_page', lambda i: ('GET', f'/characters?limit=50&after={pick("characters") - 1}', None)),
+        ('get_characters_stream', lambda i: ('GET', '/characters?stream=1', None)),
+        ('get_characters_ids', lambda i: ('GET', f'/characters?ids={some("characters")}', None)),
+        ('get_characters_filtered', lambda i: ('GET', '/characters?gender=female&sort=-name&fields=name,gender&limit=50', None)),
+        ('get_top_characters', lambda i: ('GET', '/characters/top?limit=10', None)),
+        ('get_one_character', lambda i: ('GET', f'/character/{pick("characters")}', None)),
+        ('get_planets', lambda i: ('GET', '/planets', None)),
+        ('get_planets_ids', lambda i: ('GET', f'/planets?ids={some("planets")}', None)),
+        ('get_planets_prefix', lambda i: ('GET', f'/planets?name=planet+{pick("planets") % 10}*&sort=name&limit=50', None)),
+        ('get_top_planets', lambda i: ('GET', '/planets/top?limit=10', None)),
+        ('get_one_planet', lambda i: ('GET', f'/planet/{pick("planets")}', None)),
+        ('get_vehicles', lambda i: ('GET', '/vehicles', None)),
+        ('get_vehicles_ids', lambda i: ('GET', f'/vehicles?ids={some("vehicles")}', None)),
+        ('get_vehicles_filtered', lambda i: ('GET', f'/vehicles?size={pick("vehicles") % 40}&sort=-name&fields=name,size', None)),
+        ('get_top_vehicles', lambda i: ('GET', '/vehicles/top?limit=10', None)),
+        ('get_one_vehicle', lambda i: ('GET', f'/vehicle/{pick("vehicles")}', None)),
+        ('search_catalog', lambda i: ('GET', f'/search?q=character+{pick("characters") - 1}', None)),
+        ('search_catalog_prefix', lambda i: ('GET', '/search?q=plan&kind=planet,vehicle&limit=20', None)),
+        ('get_user_favorites', lambda i: ('GET', f'/favorites/user/{pick("users")}', None)),
+        ('get_pool_stats', lambda i: ('GET', '/health/pool', None)),
+        ('get_metrics', lambda i: ('GET', '/metrics', None)),
+    ]
+    # EL FEED DE CAMBIOS SE MIDE DESPUES DE LAS ESCRITURAS, CUANDO YA TIENE ENTRADAS
+    changes = [
+        ('get_changes', lambda i: ('GET', f'/changes?since={i * 10}&limit=100', None)),
+        ('get_changes_user', lambda i: ('GET', f'/changes?since={i * 10}&limit=100&user_id={pick("users")}', None)),
+    ]
+    if reads_only:
+        return scenarios + changes
+
+    scenarios += [
+        ('post_user', lambda i: ('POST', '/user', {"name": 'bench', "last_name": 'user', "email": f'{run_id}-{i}@bench.test', "password": 'secret'})),
+        ('post_character', lambda i: ('POST', '/character', character_payload(f'{run_id} character {i}'))),
+        ('post_characters', lambda i: ('POST', '/characters', [character_payload(f'{run_id} bulk character {i}-{n}') for n in range(100)])),
+        ('post_planet', lambda i: ('POST', '/planet', planet_payload(f'{run_id} planet {i}'))),
+        ('post_planets', lambda i: ('POST', '/planets', [planet_payload(f'{run_id} bulk planet {i}-{n}') for n in range(100)])),
+        ('post_vehicle', lambda i: ('POST', '/vehicle', vehicle_payload(f'{run_id} vehicle {i}'))),
+        ('post_vehicles', lambda i: ('POST', '/vehicles', [vehicle_payload(f'{run_id} bulk vehicle {i}-{n}') for n in range(100)])),
+        ('post_user_favorites', lambda i: ('POST', f'/favorites/user/{pick("users")}', {
+            "add": [{"kind": 'character', "id": pick('characters')} for _ in range(10)],
+            "remove": [{"kind": 'planet', "id": pick('planets')} for _ in range(10)],
+        })),
+    ]
+    # ALTA Y BAJA DEL MISMO FAVORITO EN PETICIONES ALTERNAS
+    for kind in ('character', 'planet', 'vehicle'):
+        pairs = {}
+
+        def favorite_pair(i, kind=kind, pairs=pairs):
+            key = i // 2
+            if key not in pairs:
+                pairs[key] = (pick('users'), pick(kind + 's'))
+            user_id, item_id = pairs[key]
+            return ('POST' if i % 2 == 0 else 'DELETE', f'/favorite/user/{kind}/{user_id}/{item_id}', None)
+        scenarios.append((f'post_delete_favorite_{kind}', favorite_pair))
+
+    scenarios += changes + [
+        ('delete_one_character', lambda i: ('DELETE', f'/character/{pop("character")[0]}', None)),
+        ('delete_characters', lambda i: ('DELETE', '/characters', pop('character', BULK_DELETE_SIZE))),
+        ('delete_one_planet', lambda i: ('DELETE', f'/planet/{pop("planet")[0]}', None)),
+        ('delete_planets', lambda i: ('DELETE', '/planets', pop('planet', BULK_DELETE_SIZE))),
+        ('delete_one_vehicle', lambda i: ('DELETE', f'/vehicle/{pop("vehicle")[0]}', None)),
+        ('delete_vehicles', lambda i: ('DELETE', '/vehicles', pop('vehicle', BULK_DELETE_SIZE))),
+        ('delete_one_user', lambda i: ('DELETE', f'/user/{pop("user")[0]}', None)),
+        ('delete_users', lambda i: ('DELETE', '/users', pop('user', BULK_DELETE_SIZE))),
+    ]
+    return scenarios
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample[0] for sample in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+        "statuses": statuses,
+    }
+
+def query_count(server_timing):
+    match = QUERIES_PATTERN.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+# MODO 1: CLIENTE DE PRUEBAS DE FLASK (SECUENCIAL, SIN RED)
+def run_test_client(database_url, scenarios, requests):
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    results = {}
+    for name, scenario in scenarios:
+        samples = []
+        started = time.perf_counter()
+        for i in range(requests):
+            method, path, body = scenario(i)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            samples.append((time.perf_counter() - start, response.status_code, query_count(response.headers.get('Server-Timing'))))
+        results[name] = summarize(samples, time.perf_counter() - started)
+    return results
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'gunicorn did not start listening on port {port}')
+
+def http_request(port, method, path, body):
+    payload = json.dumps(body) if body is not None else None
+    headers = {"Content-Type": 'application/json', "Connection": 'close'} if payload else {"Connection": 'close'}
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    try:
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return time.perf_counter() - start, response.status, query_count(response.getheader('Server-Timing'))
+    except (OSError, http.client.HTTPException):
+        return time.perf_counter() - start, 'connection_error', None
+    finally:
+        connection.close()
+
+# MODO 2: PROCESO REAL DE GUNICORN CON PETICIONES CONCURRENTES
+def run_gunicorn(database_url, scenarios, requests, workers, concurrency, worker_class='sync', app_target='wsgi:application'):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', app_target, '--chdir', SRC_DIR,
+         '--workers', str(workers), '--worker-class', worker_class, '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        wait_for_port(port)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for name, scenario in scenarios:
+                calls = [scenario(i) for i in range(requests)]
+                started = time.perf_counter()
+                samples = list(executor.map(lambda call: http_request(port, *call), calls))
+                results[name] = summarize(samples, time.perf_counter() - started)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--requests', type=int, default=100, help='requests per route')
+    parser.add_argument('--gunicorn', action='store_true', help='also benchmark a real gunicorn process')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--reads-only', action='store_true', help='skip POST/DELETE routes')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    run_id = f'bench-{int(time.time())}'
+
+    def fresh_scenarios():
+        volumes = seed(database_url, args.users, args.characters, args.planets, args.vehicles, args.favorites)
+        victims = {} if args.reads_only else seed_victims(database_url, args.requests * (1 + BULK_DELETE_SIZE))
+        return volumes, build_scenarios(volumes, victims, run_id, args.reads_only)
+
+    volumes, scenarios = fresh_scenarios()
+    # LOS print() DE LA APP VAN A stderr PARA NO MEZCLARSE CON EL INFORME JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        client_results = run_test_client(database_url, scenarios, args.requests)
+    report = {
+        "config": {
+            "python": platform.python_version(),
+            "database": database_url.split('://')[0],
+            "requests_per_route": args.requests,
+            "volumes": volumes,
+        },
+        "test_client": client_results,
+    }
+    if args.gunicorn:
+        _, scenarios = fresh_scenarios()
+        report["config"].update({"workers": args.workers, "concurrency": args.concurrency})
+        report["gunicorn"] = run_gunicorn(database_url, scenarios, args.requests, args.workers, args.concurrency)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
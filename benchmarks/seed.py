@@ -0,0 +1,97 @@
+"""
+Seeds a database with a configurable volume of users, characters, planets,
+vehicles and favorites for the benchmarks.
+
+    $ python benchmarks/seed.py --database-url sqlite:////tmp/bench.db --characters 100000
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sqlalchemy import create_engine, select, literal, func  # noqa: E402
+from models import db, User, Character, Planet, Vehicle, Favorite, FavoriteCount  # noqa: E402
+import search  # noqa: E402,F401  (registers the SQLite full-text index on create_all)
+
+BATCH_SIZE = 20000
+DEFAULT_VOLUMES = {"users": 1000, "characters": 5000, "planets": 2000, "vehicles": 2000, "favorites": 50000}
+
+def batched_insert(connection, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+def seed(database_url, users, characters, planets, vehicles, favorites, seed_value=42):
+    engine = create_engine(database_url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    rng = random.Random(seed_value)
+    with engine.begin() as connection:
+        batched_insert(connection, User.__table__, (
+            {"name": f'user {i}', "last_name": 'bench', "email": f'user{i}@bench.test', "password": 'secret', "subscription_date": date(2024, 1, 1)}
+            for i in range(users)
+        ))
+        batched_insert(connection, Character.__table__, (
+            {"name": f'character {i}', "birth_year": f'{i % 100}BBY', "gender": rng.choice(('male', 'female', 'n/a')),
+             "height": str(150 + i % 60), "eye_color": rng.choice(('blue', 'brown', 'yellow', 'red')),
+             "skin_color": rng.choice(('fair', 'gold', 'white', 'green')), "image": f'https://starwars-visualguide.com/assets/img/characters/{i}.jpg'}
+            for i in range(characters)
+        ))
+        batched_insert(connection, Planet.__table__, (
+            {"name": f'planet {i}', "climate": rng.choice(('arid', 'temperate', 'frozen', 'murky')), "population": str(i * 1000),
+             "orbital_period": str(300 + i % 100), "rotation_period": str(20 + i % 10), "diameter": str(10000 + i),
+             "image": f'https://starwars-visualguide.com/assets/img/planets/{i}.jpg'}
+            for i in range(planets)
+        ))
+        batched_insert(connection, Vehicle.__table__, (
+            {"name": f'vehicle {i}', "model": f'model {i % 50}', "size": i % 40}
+            for i in range(vehicles)
+        ))
+
+        kinds = [(column, count) for column, count in (('character_id', characters), ('planet_id', planets), ('vehicle_id', vehicles)) if count]
+        favorites = min(favorites, users * sum(count for _, count in kinds)) if users and kinds else 0
+
+        def favorite_rows():
+            seen = set()
+            while len(seen) < favorites:
+                column, count = rng.choice(kinds)
+                key = (rng.randint(1, users), column, rng.randint(1, count))
+                if key in seen:
+                    continue
+                seen.add(key)
+                row = {"user_id": key[0], "character_id": None, "planet_id": None, "vehicle_id": None}
+                row[column] = key[2]
+                yield row
+        batched_insert(connection, Favorite.__table__, favorite_rows())
+
+        # favorite_count is maintained by the write paths, so seeded favorites need their counters too
+        for kind, column in FavoriteCount.KINDS.items():
+            item_id = Favorite.__table__.c[column]
+            connection.execute(FavoriteCount.__table__.insert().from_select(
+                ['kind', 'item_id', 'favorites'],
+                select(literal(kind), item_id, func.count()).where(item_id.isnot(None)).group_by(item_id),
+            ))
+    engine.dispose()
+    return {"users": users, "characters": characters, "planets": planets, "vehicles": vehicles, "favorites": favorites}
+
+def add_volume_arguments(parser):
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+    print(seed(args.database_url, args.users, args.characters, args.planets, args.vehicles, args.favorites))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+CPU time of the list endpoints with the old and the new serialization.
+
+Seeds a throwaway database and renders GET /users, /characters, /planets and
+/vehicles (full list and ?limit=500) three ways, timing process CPU:
+
+    orm_stdlib      ORM objects + serialize() + the stdlib JSON provider (before)
+    tuples_stdlib   column tuples + the stdlib JSON provider
+    tuples_fast     column tuples + the app's JSON provider (orjson if installed)
+
+    $ python benchmarks/serialization.py --characters 20000 --repeat 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed, add_volume_arguments  # noqa: E402
+
+MODELS = ('User', 'Character', 'Planet', 'Vehicle')
+
+def cpu_time(render, repeat, session):
+    samples = []
+    for _ in range(repeat):
+        # SESION NUEVA EN CADA VUELTA PARA QUE EL IDENTITY MAP NO SE REUTILICE
+        session.remove()
+        start = time.process_time()
+        render()
+        samples.append(time.process_time() - start)
+    samples.sort()
+    return round(samples[len(samples) // 2] * 1000, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    volumes = seed(database_url, args.users, args.characters, args.planets, args.vehicles, 0)
+    os.environ['DATABASE_URL'] = database_url
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    app = create_app()
+    import models
+    import listing
+    from listing import list_response
+    from serialization import FastJSONProvider
+
+    stdlib = DefaultJSONProvider(app)
+    fast = app.json
+
+    def orm_stdlib(model, limit):
+        query = model.query.order_by(model.id)
+        items = query.limit(limit).all() if limit else query.all()
+        return stdlib.response([item.serialize() for item in items])
+
+    def tuples(provider, model, limit):
+        app.json = provider
+        try:
+            return list_response(model, 'empty')
+        finally:
+            app.json = fast
+
+    report = {"config": {"database": database_url.split('://')[0], "repeat": args.repeat, "volumes": volumes,
+                         "fast_backend": FastJSONProvider.backend}, "results": {}}
+    for name in MODELS:
+        model = getattr(models, name)
+        for limit in (None, listing.MAX_PAGE_SIZE):
+            path = f'/{model.__tablename__}s' + (f'?limit={limit}' if limit else '')
+            with app.test_request_context(path):
+                before = cpu_time(lambda: orm_stdlib(model, limit), args.repeat, models.db.session)
+                middle = cpu_time(lambda: tuples(stdlib, model, limit), args.repeat, models.db.session)
+                after = cpu_time(lambda: tuples(fast, model, limit), args.repeat, models.db.session)
+            report["results"][path] = {
+                "orm_stdlib_ms": before,
+                "tuples_stdlib_ms": middle,
+                "tuples_fast_ms": after,
+                "speedup": round(before / after, 2) if after else None,
+            }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Catalog reads from the database versus the shared memory-mapped snapshot.
+
+Seeds a throwaway database and times, in process CPU, the views behind
+GET /characters (full list and ?limit=500 pages), GET /character/<id> and
+GET /planets with CATALOG_SNAPSHOT off (before) and on (after). The response
+cache is disabled so every request runs the view. Also reports the snapshot
+file size, which is the memory every worker on the host shares.
+
+    $ python benchmarks/snapshot.py --characters 20000 --repeat 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed, add_volume_arguments  # noqa: E402
+
+def cpu_time(client, paths, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for path in paths:
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        samples.append((time.process_time() - start) / len(paths))
+    return round(statistics.median(samples) * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'bench.db')
+    volumes = seed(database_url, args.users, args.characters, args.planets, args.vehicles, 0)
+    os.environ.update(DATABASE_URL=database_url, CACHE_ENABLED='0', CATALOG_SNAPSHOT='1',
+                      CATALOG_SNAPSHOT_PATH=os.path.join(directory, 'catalog.snapshot'))
+
+    from app import create_app
+    from listing import MAX_PAGE_SIZE
+    from snapshot import catalog_snapshot
+    app = create_app(features=())
+    client = app.test_client()
+    # the snapshot is rebuilt in the background; build it up front so every timed read uses it
+    with app.app_context():
+        catalog_snapshot.rebuild()
+
+    rng = random.Random(42)
+    pages = [f'/characters?limit={MAX_PAGE_SIZE}&after={after}' for after in range(0, args.characters, MAX_PAGE_SIZE)]
+    scenarios = {
+        "/characters": ['/characters'],
+        f"/characters?limit={MAX_PAGE_SIZE}&after=": pages,
+        "/character/<id>": [f'/character/{rng.randint(1, args.characters)}' for _ in range(200)],
+        "/planets": ['/planets'],
+    }
+
+    report = {"config": {"database": database_url.split('://')[0], "repeat": args.repeat, "volumes": volumes}, "results": {}}
+    for name, paths in scenarios.items():
+        catalog_snapshot.enabled = False
+        before = cpu_time(client, paths, args.repeat)
+        catalog_snapshot.enabled = True
+        after = cpu_time(client, paths, args.repeat)
+        report["results"][name] = {"database_ms": before, "snapshot_ms": after, "speedup": round(before / after, 1) if after else None}
+    report["snapshot_bytes"] = os.path.getsize(catalog_snapshot.path)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+App startup cost: import time and per-worker memory.
+
+1. In a fresh interpreter per run, times `import app` and `create_app()` with
+   every feature (admin, swagger, sitemap, migrate) and with none (API-only),
+   and counts the modules loaded.
+2. Starts gunicorn `wsgi:application` with WORKERS sync workers as
+   full / no preload (before), API-only / no preload, and API-only / preload
+   (after), then reports the time until the first response and the RSS and
+   PSS of each worker (PSS counts shared copy-on-write pages once).
+
+    $ python benchmarks/startup.py --workers 4 --output startup.json
+
+Memory figures are read from /proc and need Linux.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed  # noqa: E402
+from run import SRC_DIR, free_port, http_request  # noqa: E402
+
+IMPORT_PROBE = '''
+import sys, time, json, resource
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(features={features!r})
+created = time.perf_counter()
+print(json.dumps({{
+    "import_ms": round((imported - start) * 1000, 1),
+    "create_app_ms": round((created - imported) * 1000, 1),
+    "modules": len(sys.modules),
+    "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}}))
+'''
+
+CONFIGS = {
+    "full_no_preload": {"APP_FEATURES": 'admin,swagger,sitemap,migrate', "GUNICORN_PRELOAD": '0'},
+    "api_no_preload": {"APP_FEATURES": 'none', "GUNICORN_PRELOAD": '0'},
+    "api_preload": {"APP_FEATURES": 'none', "GUNICORN_PRELOAD": '1'},
+}
+
+def median_run(features, database_url, runs):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_PROBE.format(features=features)], cwd=SRC_DIR, env=env)
+        samples.append(json.loads(output.decode().strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+def memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name.lower()] = int(rest.split()[0])
+    return values
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as file:
+        return [int(child) for child in file.read().split()]
+
+def measure_gunicorn(database_url, workers, env_overrides):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, CACHE_ENABLED='0', **env_overrides)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'wsgi:application', '--chdir', SRC_DIR,
+         '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        # DESDE LA RAIZ DEL REPOSITORIO PARA QUE GUNICORN LEA gunicorn.conf.py (GUNICORN_PRELOAD)
+        cwd=os.path.join(SRC_DIR, '..'), env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        first_response = None
+        deadline = time.monotonic() + 60
+        while first_response is None and time.monotonic() < deadline:
+            _, status, _ = http_request(port, 'GET', '/characters?limit=10', None)
+            if status == 200:
+                first_response = time.perf_counter() - started
+            else:
+                time.sleep(0.02)
+        # CADA WORKER ATIENDE ALGUNAS PETICIONES ANTES DE MEDIR SU MEMORIA
+        for _ in range(workers * 20):
+            http_request(port, 'GET', '/characters?limit=10', None)
+        time.sleep(0.5)
+        worker_memory = [memory_kb(pid) for pid in children(process.pid)]
+        return {
+            "first_response_ms": round(first_response * 1000, 1) if first_response else None,
+            "workers": len(worker_memory),
+            "worker_rss_mb": round(statistics.mean(memory["rss"] for memory in worker_memory) / 1024, 1),
+            "worker_pss_mb": round(statistics.mean(memory["pss"] for memory in worker_memory) / 1024, 1),
+            "master_rss_mb": round(memory_kb(process.pid)["rss"] / 1024, 1),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per import measurement')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    seed(database_url, users=10, characters=100, planets=10, vehicles=10, favorites=0)
+
+    report = {
+        "config": {"database": database_url.split('://')[0], "workers": args.workers, "runs": args.runs},
+        "import": {
+            "full": median_run(('admin', 'swagger', 'sitemap', 'migrate'), database_url, args.runs),
+            "api_only": median_run((), database_url, args.runs),
+        },
+        "gunicorn": {name: measure_gunicorn(database_url, args.workers, overrides) for name, overrides in CONFIGS.items()},
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
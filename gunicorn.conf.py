@@ -0,0 +1,8 @@
+# Gunicorn settings. gunicorn reads ./gunicorn.conf.py from the directory it is started
+# in (the repository root for the Procfile and render.yaml start commands).
+import os
+
+# GUNICORN_PRELOAD=1 IMPORTA Y CREA LA APP UNA SOLA VEZ EN EL PROCESO MAESTRO ANTES DE
+# CREAR LOS WORKERS: ARRANCAN MAS RAPIDO Y COMPARTEN LAS PAGINAS DEL CODIGO IMPORTADO
+# (COPY-ON-WRITE). LAS CONEXIONES A LA BASE SE ABREN EN CADA WORKER (VER pool.py)
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') not in ('0', 'false')
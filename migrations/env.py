@@ -80,6 +80,10 @@ def run_migrations_online():
     connectable = current_app.extensions['migrate'].db.get_engine()
 
     with connectable.connect() as connection:
+        # LA APP ACTIVA LAS FOREIGN KEYS EN SQLITE; LAS MIGRACIONES BATCH RECREAN TABLAS
+        # (DROP + RENAME) Y CON ELLAS ACTIVADAS SQLITE BORRARIA LOS FAVORITOS EN CASCADA
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
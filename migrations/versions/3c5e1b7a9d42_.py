@@ -0,0 +1,32 @@
+"""add table_version
+
+Revision ID: 3c5e1b7a9d42
+Revises: 00ca71c2a39f
+Create Date: 2026-10-18 10:12:41.204133
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e1b7a9d42'
+down_revision = '00ca71c2a39f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_version = op.create_table('table_version',
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_version, [
+        {'name': name, 'version': 0}
+        for name in ('user', 'character', 'planet', 'vehicle', 'favorite')
+    ])
+
+
+def downgrade():
+    op.drop_table('table_version')
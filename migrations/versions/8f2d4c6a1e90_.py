@@ -0,0 +1,40 @@
+"""add favorite indexes and per-kind unique constraints
+
+Revision ID: 8f2d4c6a1e90
+Revises: 3c5e1b7a9d42
+Create Date: 2026-10-18 11:02:17.551820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d4c6a1e90'
+down_revision = '3c5e1b7a9d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # remove duplicated favorites (keep the oldest) so the unique indexes can be created
+    op.execute(
+        'DELETE FROM favorite WHERE id NOT IN '
+        '(SELECT MIN(id) FROM favorite GROUP BY user_id, character_id, planet_id, vehicle_id)'
+    )
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.create_index('ix_favorite_user_id', ['user_id'], unique=False)
+        batch_op.create_index('uq_favorite_user_character', ['user_id', 'character_id'], unique=True,
+                              sqlite_where=sa.text('character_id IS NOT NULL'), postgresql_where=sa.text('character_id IS NOT NULL'))
+        batch_op.create_index('uq_favorite_user_planet', ['user_id', 'planet_id'], unique=True,
+                              sqlite_where=sa.text('planet_id IS NOT NULL'), postgresql_where=sa.text('planet_id IS NOT NULL'))
+        batch_op.create_index('uq_favorite_user_vehicle', ['user_id', 'vehicle_id'], unique=True,
+                              sqlite_where=sa.text('vehicle_id IS NOT NULL'), postgresql_where=sa.text('vehicle_id IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_index('uq_favorite_user_vehicle')
+        batch_op.drop_index('uq_favorite_user_planet')
+        batch_op.drop_index('uq_favorite_user_character')
+        batch_op.drop_index('ix_favorite_user_id')
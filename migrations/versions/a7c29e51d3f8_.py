@@ -0,0 +1,56 @@
+"""favorite foreign keys on delete cascade
+
+Revision ID: a7c29e51d3f8
+Revises: f1a6d3b9c207
+Create Date: 2026-10-18 17:41:09.562813
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c29e51d3f8'
+down_revision = 'f1a6d3b9c207'
+branch_labels = None
+depends_on = None
+
+# LAS FOREIGN KEYS SE CREARON SIN NOMBRE: EN POSTGRES SE LLAMAN favorite_<columna>_fkey
+# Y EN SQLITE (SIN NOMBRE) SE LES DA EL MISMO CON LA CONVENCION AL RECREAR LA TABLA
+NAMING_CONVENTION = {"fk": "favorite_%(column_0_name)s_fkey"}
+FOREIGN_KEYS = (('user_id', 'user'), ('character_id', 'character'), ('planet_id', 'planet'), ('vehicle_id', 'vehicle'))
+
+
+def replace_foreign_keys(ondelete):
+    with op.batch_alter_table('favorite', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, table in FOREIGN_KEYS:
+            batch_op.drop_constraint(f'favorite_{column}_fkey', type_='foreignkey')
+            batch_op.create_foreign_key(f'favorite_{column}_fkey', table, [column], ['id'], ondelete=ondelete)
+
+    # SQLITE RECREA LA TABLA Y LOS INDICES UNICOS PARCIALES PIERDEN SU WHERE (NO SE REFLEJA),
+    # ASI QUE SE VUELVEN A CREAR COMO EN 8f2d4c6a1e90
+    if op.get_context().dialect.name == 'sqlite':
+        with op.batch_alter_table('favorite', schema=None) as batch_op:
+            for column in ('character_id', 'planet_id', 'vehicle_id'):
+                name = 'uq_favorite_user_' + column[:-3]
+                batch_op.drop_index(name)
+                batch_op.create_index(name, ['user_id', column], unique=True, sqlite_where=sa.text(f'{column} IS NOT NULL'))
+
+
+def upgrade():
+    # LOS FAVORITOS SE BORRAN EN LA BASE AL BORRAR SU USUARIO, PERSONAJE, PLANETA O VEHICULO
+    # ANTES SQLALCHEMY PONIA A NULL LA COLUMNA, ASI QUE PRIMERO SE LIMPIAN ESOS FAVORITOS HUERFANOS
+    op.execute('DELETE FROM favorite WHERE character_id IS NULL AND planet_id IS NULL AND vehicle_id IS NULL')
+    replace_foreign_keys('CASCADE')
+    # EL CASCADE BUSCA LOS FAVORITOS DE CADA ELEMENTO BORRADO POR ESTAS COLUMNAS
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        for column in ('character_id', 'planet_id', 'vehicle_id'):
+            batch_op.create_index(f'ix_favorite_{column}', [column], unique=False,
+                                  sqlite_where=sa.text(f'{column} IS NOT NULL'), postgresql_where=sa.text(f'{column} IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        for column in ('vehicle_id', 'planet_id', 'character_id'):
+            batch_op.drop_index(f'ix_favorite_{column}')
+    replace_foreign_keys(None)
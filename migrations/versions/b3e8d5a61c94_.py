@@ -0,0 +1,43 @@
+"""add change_log
+
+Revision ID: b3e8d5a61c94
+Revises: a7c29e51d3f8
+Create Date: 2026-10-18 19:26:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d5a61c94'
+down_revision = 'a7c29e51d3f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_created_at', ['created_at'], unique=False)
+
+    # LA FILA DE VERSION QUE ORDENA LAS ESCRITURAS EN EL REGISTRO (changes.py) TIENE QUE EXISTIR
+    table_version = sa.table('table_version', sa.column('name', sa.String), sa.column('version', sa.Integer))
+    op.bulk_insert(table_version, [{'name': 'change_log', 'version': 0}])
+
+
+def downgrade():
+    op.execute("DELETE FROM table_version WHERE name = 'change_log'")
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_created_at')
+
+    op.drop_table('change_log')
@@ -0,0 +1,61 @@
+"""add catalog search index
+
+Revision ID: d7a3f1c08b26
+Revises: b41e7d93c5a8
+Create Date: 2026-10-18 13:05:52.907114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f1c08b26'
+down_revision = 'b41e7d93c5a8'
+branch_labels = None
+depends_on = None
+
+KINDS = {'character': 1, 'planet': 2, 'vehicle': 3}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # FTS5 table kept in sync by triggers (same statements as src/search.py)
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_search USING fts5("
+            "name, kind UNINDEXED, ref_id UNINDEXED, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        )
+        for kind, code in KINDS.items():
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS catalog_search_{kind}_insert AFTER INSERT ON {kind} BEGIN "
+                f"INSERT INTO catalog_search(rowid, name, kind, ref_id) VALUES (new.id * 4 + {code}, new.name, '{kind}', new.id); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS catalog_search_{kind}_update AFTER UPDATE OF name ON {kind} BEGIN "
+                f"UPDATE catalog_search SET name = new.name WHERE rowid = old.id * 4 + {code}; END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS catalog_search_{kind}_delete AFTER DELETE ON {kind} BEGIN "
+                f"DELETE FROM catalog_search WHERE rowid = old.id * 4 + {code}; END"
+            )
+            op.execute(
+                f"INSERT INTO catalog_search(rowid, name, kind, ref_id) SELECT id * 4 + {code}, name, '{kind}', id FROM {kind}"
+            )
+    elif dialect == 'postgresql':
+        # trigram indexes serve the ILIKE '%q%' search directly, no extra table to maintain
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for kind in KINDS:
+            op.execute(f'CREATE INDEX IF NOT EXISTS ix_{kind}_name_trgm ON "{kind}" USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for kind in KINDS:
+            for action in ('insert', 'update', 'delete'):
+                op.execute(f'DROP TRIGGER IF EXISTS catalog_search_{kind}_{action}')
+        op.execute('DROP TABLE IF EXISTS catalog_search')
+    elif dialect == 'postgresql':
+        for kind in KINDS:
+            op.execute(f'DROP INDEX IF EXISTS ix_{kind}_name_trgm')
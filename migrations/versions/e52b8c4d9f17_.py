@@ -0,0 +1,41 @@
+"""add favorite_count
+
+Revision ID: e52b8c4d9f17
+Revises: d7a3f1c08b26
+Create Date: 2026-10-18 14:32:18.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e52b8c4d9f17'
+down_revision = 'd7a3f1c08b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('favorite_count',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('favorites', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'item_id')
+    )
+    with op.batch_alter_table('favorite_count', schema=None) as batch_op:
+        batch_op.create_index('ix_favorite_count_top', ['kind', 'favorites', 'item_id'], unique=False)
+
+    # CONTADORES INICIALES A PARTIR DE LOS FAVORITOS EXISTENTES
+    for kind in ('character', 'planet', 'vehicle'):
+        op.execute(
+            f"INSERT INTO favorite_count (kind, item_id, favorites) "
+            f"SELECT '{kind}', {kind}_id, COUNT(*) FROM favorite WHERE {kind}_id IS NOT NULL GROUP BY {kind}_id"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('favorite_count', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorite_count_top')
+
+    op.drop_table('favorite_count')
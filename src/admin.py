@@ -1,7 +1,58 @@
 import os
+from collections import Counter
 from flask_admin import Admin
-from models import db, User, Character, Planet, Vehicle, Favorite
+from models import db, User, Character, Planet, Vehicle, Favorite, FavoriteCount, ChangeLog
 from flask_admin.contrib.sqla import ModelView
+from changes import record_changes, stage_changes
+from upsert import add_favorite_counts
+from bulk import remove_favorites_of
+
+# LAS EDICIONES DESDE EL ADMIN TAMBIEN SE ANOTAN EN EL REGISTRO DE CAMBIOS Y SUBEN LA VERSION
+# DE LA TABLA EN LA MISMA TRANSACCION, ASI LA CACHE DE RESPUESTAS DEJA DE USAR LAS ENTRADAS ANTIGUAS
+class InvalidatingModelView(ModelView):
+    def record_change(self, model, op):
+        if model.__tablename__ in ChangeLog.KINDS:
+            if model.id is None:
+                db.session.flush()
+            record_changes(model.__tablename__, op, [model.id], getattr(model, 'user_id', None))
+
+    def on_model_change(self, form, model, is_created):
+        self.record_change(model, 'upsert')
+        stage_changes(model.__tablename__)
+
+    def on_model_delete(self, model):
+        self.record_change(model, 'delete')
+        stage_changes(model.__tablename__)
+
+# LOS FAVORITOS EDITADOS DESDE EL ADMIN PUEDEN CAMBIAR DE ELEMENTO: SE RESTA 1 AL CONTADOR DEL
+# ELEMENTO ANTERIOR Y SE SUMA 1 AL NUEVO, EN LA MISMA TRANSACCION QUE LA EDICION
+class FavoriteModelView(InvalidatingModelView):
+    def counted_items(self, favorite):
+        return Counter((kind, getattr(favorite, column)) for kind, column in FavoriteCount.KINDS.items() if getattr(favorite, column) is not None)
+
+    def on_model_change(self, form, model, is_created):
+        deltas = Counter()
+        if not is_created:
+            # LOS VALORES GUARDADOS, ANTES DE ESCRIBIR LOS DEL FORMULARIO
+            with db.session.no_autoflush:
+                stored = db.session.query(Favorite.character_id, Favorite.planet_id, Favorite.vehicle_id).filter_by(id=model.id).one()
+            deltas.subtract(self.counted_items(stored))
+        db.session.flush()
+        deltas.update(self.counted_items(model))
+        add_favorite_counts(deltas)
+        super().on_model_change(form, model, is_created)
+
+    def on_model_delete(self, model):
+        add_favorite_counts({item: -1 for item in self.counted_items(model)})
+        super().on_model_delete(model)
+
+# AL BORRAR UN USUARIO, PERSONAJE, PLANETA O VEHICULO LA BASE BORRA SUS FAVORITOS
+# (ON DELETE CASCADE), ASI QUE TAMBIEN CAMBIAN LA TABLA FAVORITE Y LOS CONTADORES
+class CascadingModelView(InvalidatingModelView):
+    def on_model_delete(self, model):
+        remove_favorites_of(type(model), [model.id])
+        self.record_change(model, 'delete')
+        stage_changes(model.__tablename__, 'favorite')
 
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
@@ -10,10 +61,10 @@ def setup_admin(app):
 
     
     # Add your models here, for example this is how we add a the User model to the admin
-    admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(Character, db.session))
-    admin.add_view(ModelView(Planet, db.session))
-    admin.add_view(ModelView(Vehicle, db.session))
-    admin.add_view(ModelView(Favorite, db.session))
+    admin.add_view(CascadingModelView(User, db.session))
+    admin.add_view(CascadingModelView(Character, db.session))
+    admin.add_view(CascadingModelView(Planet, db.session))
+    admin.add_view(CascadingModelView(Vehicle, db.session))
+    admin.add_view(FavoriteModelView(Favorite, db.session))
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
@@ -3,42 +3,70 @@ This module takes care of starting the API Server, Loading the DB and Adding the
 """
 import os
 from datetime import date
-from flask import Flask, request, jsonify, url_for
-from flask_migrate import Migrate
-from flask_swagger import swagger
+from flask import Flask, Blueprint, request, jsonify, url_for, current_app
 from flask_cors import CORS
+from sqlalchemy import exc
 from utils import APIException, generate_sitemap
-from admin import setup_admin
+from listing import list_response
+from compound import compound_user_response
+from cache import response_cache
+from changes import commit_changes, record_changes
+from etag import conditional
+from pool import engine_options_from_env, enable_sqlite_foreign_keys, pool_metrics, log_pool_stats
+from metrics import init_metrics
+from ratelimit import rate_limiter
+from snapshot import catalog_snapshot
+from compression import response_compressor
+from serialization import init_json
+from replicas import replica_router
+from search import search_response
+from changefeed import changes_response
+from bulk import bulk_create, bulk_favorites, bulk_delete, delete_items, CHARACTER_FIELDS, PLANET_FIELDS, VEHICLE_FIELDS
+from ranking import top_response
+from upsert import insert_ignore, insert_favorite, add_favorite_count
+from idempotency import idempotent
+from commands import setup_commands
 from models import db, User, Character, Planet, Vehicle, Favorite
 #from models import Person
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+# PARTES OPCIONALES DE LA APP (APP_FEATURES=admin,swagger,sitemap,migrate)
+# LOS WORKERS QUE SOLO SIRVEN LA API PUEDEN ARRANCAR CON APP_FEATURES=none: NO IMPORTAN
+# flask_admin, flask_swagger NI flask_migrate/alembic NI CREAN LAS VISTAS DEL ADMIN
+ALL_FEATURES = ('admin', 'swagger', 'sitemap', 'migrate')
 
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def features_from_env():
+    value = os.getenv('APP_FEATURES', ','.join(ALL_FEATURES))
+    return {feature.strip() for feature in value.split(',') if feature.strip() in ALL_FEATURES}
 
-MIGRATE = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-setup_admin(app)
+api = Blueprint('api', __name__)
 
 # Handle/serialize errors like a JSON object
-@app.errorhandler(APIException)
+@api.app_errorhandler(APIException)
 def handle_invalid_usage(error):
     return jsonify(error.to_dict()), error.status_code
 
+# POOL DE CONEXIONES AGOTADO: 503 PARA QUE EL CLIENTE REINTENTE
+@api.app_errorhandler(exc.TimeoutError)
+def handle_pool_timeout(error):
+    log_pool_stats(db.engine)
+    return jsonify({'error': 'database busy, try again'}), 503, {'Retry-After': '1'}
+
 # generate sitemap with all your endpoints
-@app.route('/')
 def sitemap():
-    return generate_sitemap(app)
+    return generate_sitemap(current_app)
+
+# DOCUMENTACION DE LA API GENERADA A PARTIR DE LAS RUTAS
+def swagger_spec():
+    from flask_swagger import swagger
+    return jsonify(swagger(current_app)), 200
+
+# ESTADO DEL POOL DE CONEXIONES DE ESTE WORKER
+@api.route('/health/pool', methods=['GET'])
+def get_pool_stats():
+    return jsonify(pool_metrics.snapshot(db.engine)), 200
 
 # ENDPOINTS
-@app.route('/user', methods=['GET'])
+@api.route('/user', methods=['GET'])
 def handle_hello():
 
     response_body = {
@@ -49,19 +77,26 @@ def handle_hello():
 
 # USERS
 # GET USERS / OBTENER USUARIOS
-@app.route('/users', methods=['GET'])
+@api.route('/users', methods=['GET'])
+@conditional('user')
 def get_users():
-    users = User.query.all()
-    if len(users) == 0:
-        return jsonify('no users found'), 404
-    else: 
-        data_serialized = list(map(lambda user: user.serialize(), users)) 
-        return jsonify(data_serialized), 200
+    return list_response(User, 'no users found')
 
 # GET ONE USER / OBTENER UN USUARIO
-@app.route('/user/<int:id>', methods=['GET'])
+# ?include=favorites.character,favorites.planet DEVUELVE TAMBIEN SUS FAVORITOS (compound_user_response)
+@api.route('/user/<int:id>', methods=['GET'])
 def get_one_user(id):
-    user = User.query.filter_by(id=id).first()
+    if 'include' in request.args:
+        return get_compound_user(id)
+    return get_plain_user(id)
+
+@conditional('user', 'favorite', 'character', 'planet', 'vehicle')
+def get_compound_user(id):
+    return compound_user_response(id)
+
+@conditional('user')
+def get_plain_user(id):
+    user = db.session.get(User, id)
     if user == None:
         return jsonify('user not found'), 404
     else:
@@ -69,10 +104,10 @@ def get_one_user(id):
         return jsonify(user_serialized), 200
 
 # POST USER / AÑADIR USUARIO
-@app.route('/user', methods=['POST'])
+@api.route('/user', methods=['POST'])
+@idempotent
 def post_user():
     user = request.get_json()
-    user_by_email = User.query.filter_by(email=user['email']).first()
 
     if not isinstance(user['name'], str) or len(user['name'].strip()) == 0:
          return({'error':'"name" must be a string'}), 400
@@ -80,46 +115,60 @@ def post_user():
          return({'error':'"last_name" must be a string'}), 400
     if not isinstance(user['email'], str) or len(user['email'].strip()) == 0:
          return({'error':'"email" must be a string'}), 400
-    if user_by_email:
-        if user_by_email.email == user['email']:
-            return jsonify('This email is already used'), 403
     if not isinstance(user['password'], str) or len(user['password'].strip()) == 0:
          return({'error':'"password" must be a string'}), 400
     # if not isinstance(user['subscription_date'], date) or len(user['subscription_date'].strip()) == 0:
     #      return({'error':'"subscription_date" must be a date'}), 400
 
-    user_created = User(name=user['name'], last_name=user['last_name'], email=user['email'], password=user['password'], subscription_date=date.today())
-    db.session.add(user_created)
-    db.session.commit()
-    return jsonify(user_created.serialize()), 200
+    # EL EMAIL REPETIDO LO DETECTA EL INDICE UNICO (INSERT ... ON CONFLICT DO NOTHING)
+    values = dict(name=user['name'], last_name=user['last_name'], email=user['email'], password=user['password'], subscription_date=date.today())
+    user_id = insert_ignore(User, values, ['email'])
+    if user_id is None:
+        return jsonify('This email is already used'), 403
+    commit_changes('user')
+    return jsonify(User(id=user_id, **values).serialize()), 200
 
 # DELETE ONE USER / ELIMINAR UN USUARIO
-@app.route('/user/<int:id>', methods=['DELETE'])
+@api.route('/user/<int:id>', methods=['DELETE'])
+# UN SOLO "DELETE ... WHERE id = ?"; SUS FAVORITOS LOS BORRA LA BASE (ON DELETE CASCADE)
 def delete_one_user(id):
-    user = User.query.filter_by(id=id).first()
-    if user == None:
+    if delete_items(User, [id]) == 0:
+        db.session.rollback()
         return jsonify('user not found'), 404
     else:
-        db.session.delete(user)
-        db.session.commit()
+        commit_changes('user', 'favorite')
         return jsonify('user deleted'), 200
 
+# DELETE MANY USERS (BULK) / ELIMINAR VARIOS USUARIOS
+@api.route('/users', methods=['DELETE'])
+@rate_limiter.limit('1/s')
+def delete_users():
+    return bulk_delete(User)
+
 # CHARACTERS
 # GET CHARACTERS / OBTENER PERSONAJES
-@app.route('/characters', methods=['GET'])
+@api.route('/characters', methods=['GET'])
+@conditional('character')
+@response_cache.cached('character')
 def get_characters():
-    characters = Character.query.all()
-    if len(characters) == 0:
-        return jsonify('no characters found'), 404
-    else: 
-        # data_serialized = [character.serialize() for character in characters]   ALTERNATIVA AL MAP
-        data_serialized = list(map(lambda character: character.serialize(), characters)) 
-        return jsonify(data_serialized), 200
+    return list_response(Character, 'no characters found')
+
+# GET MOST FAVORITED CHARACTERS / OBTENER LOS PERSONAJES MAS FAVORITOS
+@api.route('/characters/top', methods=['GET'])
+@conditional('character', 'favorite')
+@response_cache.cached('character', 'favorite')
+def get_top_characters():
+    return top_response(Character)
 
 # GET ONE CHARACTER / OBTENER UN PERSONAJE
-@app.route('/character/<int:id>', methods=['GET'])
+@api.route('/character/<int:id>', methods=['GET'])
+@conditional('character')
+@response_cache.cached('character')
 def get_one_character(id):
-    character = Character.query.filter_by(id=id).first()
+    response = catalog_snapshot.item_response(Character, id, 'character not found')
+    if response is not None:
+        return response
+    character = db.session.get(Character, id)
     if character == None:
         return jsonify('character not found'), 404
     else:
@@ -127,16 +176,13 @@ def get_one_character(id):
         return jsonify(character_serialized), 200
 
 # POST CHARACTER / AÑADIR PERSONAJE
-@app.route('/character', methods=['POST'])
+@api.route('/character', methods=['POST'])
+@idempotent
 def post_character():
     character = request.get_json()
-    character_by_name = Character.query.filter_by(name=character['name']).first()
    
     if not isinstance(character['name'], str) or len(character['name'].strip()) == 0:
          return({'error':'"name" must be a string'}), 400
-    if character_by_name:
-        if character_by_name.name == character['name']:
-            return jsonify({'error':'This name is already used'}), 403
     if not isinstance(character['birth_year'], str) or len(character['birth_year'].strip()) == 0:
          return({'error':'"birth_year" must be a string'}), 400    
     if not isinstance(character['gender'], str) or len(character['gender'].strip()) == 0:
@@ -150,38 +196,62 @@ def post_character():
     if not isinstance(character['image'], str) or len(character['image'].strip()) == 0:
          return({'error':'"image" must be a string'}), 400
 
-    character_created = Character(name=character['name'],birth_year=character['birth_year'],gender=character['gender'],height=character['height'],eye_color=character['eye_color'],skin_color=character['skin_color'],image=character['image'])
-    print(character_created)
-    db.session.add(character_created)
-    db.session.commit()
+    # EL NOMBRE REPETIDO LO DETECTA EL INDICE UNICO (INSERT ... ON CONFLICT DO NOTHING)
+    values = dict(name=character['name'],birth_year=character['birth_year'],gender=character['gender'],height=character['height'],eye_color=character['eye_color'],skin_color=character['skin_color'],image=character['image'])
+    character_id = insert_ignore(Character, values, ['name'])
+    if character_id is None:
+        return jsonify({'error':'This name is already used'}), 403
+    record_changes('character', 'upsert', [character_id])
+    commit_changes('character')
     return jsonify('Character added'), 200
 
+# POST CHARACTERS (BULK) / AÑADIR VARIOS PERSONAJES
+@api.route('/characters', methods=['POST'])
+@rate_limiter.limit('1/s')
+@idempotent
+def post_characters():
+    return bulk_create(Character, CHARACTER_FIELDS, unique_name=True)
+
 # DELETE ONE CHARACTER / ELIMINAR UN PERSONAJE
-@app.route('/character/<int:id>', methods=['DELETE'])
+@api.route('/character/<int:id>', methods=['DELETE'])
 def delete_one_character(id):
-    character = Character.query.filter_by(id=id).first()
-    if character == None:
+    if delete_items(Character, [id]) == 0:
+        db.session.rollback()
         return jsonify('character not found'), 404
     else:
-        db.session.delete(character)
-        db.session.commit()
+        commit_changes('character', 'favorite')
         return jsonify('character deleted'), 200
+
+# DELETE MANY CHARACTERS (BULK) / ELIMINAR VARIOS PERSONAJES
+@api.route('/characters', methods=['DELETE'])
+@rate_limiter.limit('1/s')
+def delete_characters():
+    return bulk_delete(Character)
     
 # PLANETS
 # GET PLANETS / OBTENER PLANETAS
-@app.route('/planets', methods=['GET'])
+@api.route('/planets', methods=['GET'])
+@conditional('planet')
+@response_cache.cached('planet')
 def get_planets():
-    planets = Planet.query.all()
-    if len(planets) == 0:
-        return jsonify('no planets found'), 404
-    else: 
-        data_serialized = list(map(lambda planet: planet.serialize(), planets)) 
-        return jsonify(data_serialized), 200
+    return list_response(Planet, 'no planets found')
+
+# GET MOST FAVORITED PLANETS / OBTENER LOS PLANETAS MAS FAVORITOS
+@api.route('/planets/top', methods=['GET'])
+@conditional('planet', 'favorite')
+@response_cache.cached('planet', 'favorite')
+def get_top_planets():
+    return top_response(Planet)
 
 # GET ONE PLANET / OBTENER UN PLANETA
-@app.route('/planet/<int:id>', methods=['GET'])
+@api.route('/planet/<int:id>', methods=['GET'])
+@conditional('planet')
+@response_cache.cached('planet')
 def get_one_planet(id):
-    planet = Planet.query.filter_by(id=id).first()
+    response = catalog_snapshot.item_response(Planet, id, 'planet not found')
+    if response is not None:
+        return response
+    planet = db.session.get(Planet, id)
     if planet == None:
         return jsonify('planet not found'), 404
     else:
@@ -189,16 +259,13 @@ def get_one_planet(id):
         return jsonify(planet_serialized), 200
 
 # POST PLANET / AÑADIR PLANETA
-@app.route('/planet', methods=['POST'])
+@api.route('/planet', methods=['POST'])
+@idempotent
 def post_planet():
     planet = request.get_json()
-    planet_by_name = Planet.query.filter_by(name=planet['name']).first()
 
     if not isinstance(planet['name'], str) or len(planet['name'].strip()) == 0:
          return({'error':'"name" must be a string'}), 400
-    if planet_by_name:
-        if planet_by_name.name == planet['name']:
-            return jsonify({'error':'This name is already used'}), 403
     if not isinstance(planet['climate'], str) or len(planet['climate'].strip()) == 0:
          return({'error':'"climate" must be a string'}), 400
     if not isinstance(planet['population'], str) or len(planet['population'].strip()) == 0:
@@ -212,37 +279,62 @@ def post_planet():
     if not isinstance(planet['image'], str) or len(planet['image'].strip()) == 0:
          return({'error':'"image" must be a string'}), 400
 
-    planet_created = Planet(name=planet['name'],climate=planet['climate'],population=planet['population'],orbital_period=planet['orbital_period'], rotation_period=planet['rotation_period'],diameter=planet['diameter'],image=planet['image'])
-    db.session.add(planet_created)
-    db.session.commit()
+    # EL NOMBRE REPETIDO LO DETECTA EL INDICE UNICO (INSERT ... ON CONFLICT DO NOTHING)
+    values = dict(name=planet['name'],climate=planet['climate'],population=planet['population'],orbital_period=planet['orbital_period'], rotation_period=planet['rotation_period'],diameter=planet['diameter'],image=planet['image'])
+    planet_id = insert_ignore(Planet, values, ['name'])
+    if planet_id is None:
+        return jsonify({'error':'This name is already used'}), 403
+    record_changes('planet', 'upsert', [planet_id])
+    commit_changes('planet')
     return jsonify('Planet added'), 200
 
+# POST PLANETS (BULK) / AÑADIR VARIOS PLANETAS
+@api.route('/planets', methods=['POST'])
+@rate_limiter.limit('1/s')
+@idempotent
+def post_planets():
+    return bulk_create(Planet, PLANET_FIELDS, unique_name=True)
+
 # DELETE ONE PLANET / ELIMINAR UN PLANETA
-@app.route('/planet/<int:id>', methods=['DELETE'])
+@api.route('/planet/<int:id>', methods=['DELETE'])
 def delete_one_planet(id):
-    planet = Planet.query.filter_by(id=id).first()
-    if planet == None:
+    if delete_items(Planet, [id]) == 0:
+        db.session.rollback()
         return jsonify('planet not found'), 404
     else:
-        db.session.delete(planet)
-        db.session.commit()
+        commit_changes('planet', 'favorite')
         return jsonify('planet deleted'), 200
+
+# DELETE MANY PLANETS (BULK) / ELIMINAR VARIOS PLANETAS
+@api.route('/planets', methods=['DELETE'])
+@rate_limiter.limit('1/s')
+def delete_planets():
+    return bulk_delete(Planet)
     
 # VEHICLES
 # GET VEHICLES / OBTENER VEHICULOS
-@app.route('/vehicles', methods=['GET'])
+@api.route('/vehicles', methods=['GET'])
+@conditional('vehicle')
+@response_cache.cached('vehicle')
 def get_vehicles():
-    vehicles = Vehicle.query.all()
-    if len(vehicles) == 0:
-        return jsonify('no vehicles found'), 404
-    else: 
-        data_serialized = list(map(lambda vehicle: vehicle.serialize(), vehicles)) 
-        return jsonify(data_serialized), 200
+    return list_response(Vehicle, 'no vehicles found')
+
+# GET MOST FAVORITED VEHICLES / OBTENER LOS VEHICULOS MAS FAVORITOS
+@api.route('/vehicles/top', methods=['GET'])
+@conditional('vehicle', 'favorite')
+@response_cache.cached('vehicle', 'favorite')
+def get_top_vehicles():
+    return top_response(Vehicle)
 
 # GET ONE VEHICLE / OBTENER UN VEHICULO
-@app.route('/vehicle/<int:id>', methods=['GET'])
+@api.route('/vehicle/<int:id>', methods=['GET'])
+@conditional('vehicle')
+@response_cache.cached('vehicle')
 def get_one_vehicle(id):
-    vehicle = Vehicle.query.filter_by(id=id).first()
+    response = catalog_snapshot.item_response(Vehicle, id, 'vehicle not found')
+    if response is not None:
+        return response
+    vehicle = db.session.get(Vehicle, id)
     if vehicle == None:
         return jsonify('vehicle not found'), 404
     else:
@@ -250,7 +342,8 @@ def get_one_vehicle(id):
         return jsonify(vehicle_serialized), 200
 
 # POST VEHICLE / AÑADIR VEHICULO
-@app.route('/vehicle', methods=['POST'])
+@api.route('/vehicle', methods=['POST'])
+@idempotent
 def post_vehicle():
     vehicle = request.get_json()
    
@@ -263,26 +356,55 @@ def post_vehicle():
 
     vehicle_created = Vehicle(name=vehicle['name'],model=vehicle['model'],size=vehicle['size'])
     db.session.add(vehicle_created)
-    db.session.commit()
+    db.session.flush()
+    record_changes('vehicle', 'upsert', [vehicle_created.id])
+    commit_changes('vehicle')
     return jsonify('vehicle added'), 200
 
+# POST VEHICLES (BULK) / AÑADIR VARIOS VEHICULOS
+@api.route('/vehicles', methods=['POST'])
+@rate_limiter.limit('1/s')
+@idempotent
+def post_vehicles():
+    return bulk_create(Vehicle, VEHICLE_FIELDS)
+
 # DELETE ONE VEHICLE / ELIMINAR UN VEHICULO
-@app.route('/vehicle/<int:id>', methods=['DELETE'])
+@api.route('/vehicle/<int:id>', methods=['DELETE'])
 def delete_one_vehicle(id):
-    vehicle = Vehicle.query.filter_by(id=id).first()
-    if vehicle == None:
+    if delete_items(Vehicle, [id]) == 0:
+        db.session.rollback()
         return jsonify('vehicle not found'), 404
     else:
-        db.session.delete(vehicle)
-        db.session.commit()
+        commit_changes('vehicle', 'favorite')
         return jsonify('vehicle deleted'), 200
 
+# DELETE MANY VEHICLES (BULK) / ELIMINAR VARIOS VEHICULOS
+@api.route('/vehicles', methods=['DELETE'])
+@rate_limiter.limit('1/s')
+def delete_vehicles():
+    return bulk_delete(Vehicle)
+
+# SEARCH / BUSCAR PERSONAJES, PLANETAS Y VEHICULOS POR NOMBRE
+@api.route('/search', methods=['GET'])
+@rate_limiter.limit('10/s')
+@conditional('character', 'planet', 'vehicle')
+@response_cache.cached('character', 'planet', 'vehicle')
+def search_catalog():
+    return search_response()
+
+# CHANGES / CAMBIOS DESDE UN NUMERO DE SECUENCIA (SINCRONIZACION INCREMENTAL)
+@api.route('/changes', methods=['GET'])
+@conditional('change_log')
+def get_changes():
+    return changes_response()
+
 # FAVORITES
 # GET
 # GET THE FAVORITES OF A USER / OBTENER FAVORITOS DE UN USUARIO
-@app.route('/favorites/user/<int:user_id>', methods=['GET'])
+@api.route('/favorites/user/<int:user_id>', methods=['GET'])
+@conditional('user', 'favorite', 'character', 'planet', 'vehicle')
 def get_user_favorites(user_id):
-    user = User.query.filter_by(id=user_id).first()
+    user = User.query.options(*Favorite.eager_options()).filter_by(id=user_id).first()
     if not user:
         return jsonify('user not found'), 404
     else:
@@ -290,30 +412,32 @@ def get_user_favorites(user_id):
         if len(user_favorites["favorites"]) == 0:
             return jsonify('no favorites found'), 404
         else: 
-            return jsonify(user.get_user_favorite()), 200
+            return jsonify(user_favorites), 200
 
 # POST
 # POST FAVORITE CHARACTER / AÑADIR PERSONAJE FAVORITO
-@app.route('/favorite/user/character/<int:user_id>/<int:character_id>', methods=['POST'])
+@api.route('/favorite/user/character/<int:user_id>/<int:character_id>', methods=['POST'])
+@idempotent
 def post_favorite_character(user_id, character_id):
     user = User.query.filter_by(id=user_id).first()
     character = Character.query.filter_by(id=character_id).first()
-    user_character = Favorite.query.filter_by(user_id=user_id, character_id=character_id).first()
 
     if user == None:
         return ({'error':'user not found'}), 404
     if character == None:
         return ({'error':'character not found'}), 404
-    if user_character:
+    favorite_id = insert_favorite(user_id, 'character_id', character_id)
+    if favorite_id is None:
         return ({'error':'This favorite already exists'}), 400
     else:
-        user_favorite_character_created = Favorite(user_id=user_id, character_id=character_id)
-        db.session.add(user_favorite_character_created)
-        db.session.commit()
+        add_favorite_count('character', character_id)
+        record_changes('favorite', 'upsert', [favorite_id], user_id)
+        commit_changes('favorite')
         return jsonify('character added to user favorites'), 200
 
 # POST FAVORITE PLANET / AÑADIR PERSONAJE PLANETA
-@app.route('/favorite/user/planet/<int:user_id>/<int:planet_id>', methods=['POST'])
+@api.route('/favorite/user/planet/<int:user_id>/<int:planet_id>', methods=['POST'])
+@idempotent
 def post_favorite_planet(user_id, planet_id):
     user = User.query.filter_by(id=user_id).first()
     planet = Planet.query.filter_by(id=planet_id).first()
@@ -323,14 +447,18 @@ def post_favorite_planet(user_id, planet_id):
     else:
         if planet == None:
             return jsonify('planet not found'), 404
+        favorite_id = insert_favorite(user_id, 'planet_id', planet_id)
+        if favorite_id is None:
+            return ({'error':'This favorite already exists'}), 400
         else:
-            user_favorite_planet_created = Favorite(user_id=user_id, planet_id=planet_id)
-            db.session.add(user_favorite_planet_created)
-            db.session.commit()
+            add_favorite_count('planet', planet_id)
+            record_changes('favorite', 'upsert', [favorite_id], user_id)
+            commit_changes('favorite')
             return jsonify('planet added to user favorites'), 200
 
 # POST FAVORITE VEHICLE / AÑADIR PERSONAJE VEHICULO
-@app.route('/favorite/user/vehicle/<int:user_id>/<int:vehicle_id>', methods=['POST'])
+@api.route('/favorite/user/vehicle/<int:user_id>/<int:vehicle_id>', methods=['POST'])
+@idempotent
 def post_favorite_vehicle(user_id, vehicle_id):
     user = User.query.filter_by(id=user_id).first()
     vehicle = Vehicle.query.filter_by(id=vehicle_id).first()
@@ -340,49 +468,65 @@ def post_favorite_vehicle(user_id, vehicle_id):
     else:
         if vehicle == None:
             return jsonify('vehicle not found'), 404
+        favorite_id = insert_favorite(user_id, 'vehicle_id', vehicle_id)
+        if favorite_id is None:
+            return ({'error':'This favorite already exists'}), 400
         else:
-            user_favorite_vehicle_created = Favorite(user_id=user_id, vehicle_id=vehicle_id)
-            db.session.add(user_favorite_vehicle_created)
-            db.session.commit()
+            add_favorite_count('vehicle', vehicle_id)
+            record_changes('favorite', 'upsert', [favorite_id], user_id)
+            commit_changes('favorite')
             return jsonify('vehicle added to user favorites'), 200
 
+# POST/DELETE MANY FAVORITES (BULK) / AÑADIR Y ELIMINAR VARIOS FAVORITOS
+@api.route('/favorites/user/<int:user_id>', methods=['POST'])
+@rate_limiter.limit('1/s')
+@idempotent
+def post_user_favorites(user_id):
+    return bulk_favorites(user_id)
+
 # DELETE
 # DELETE FAVORITE CHARACTER / ELIMINAR PERSONAJE FAVORITO
-@app.route('/favorite/user/character/<int:user_id>/<int:character_id>', methods=['DELETE'])
+@api.route('/favorite/user/character/<int:user_id>/<int:character_id>', methods=['DELETE'])
 def delete_one_character_favorite(user_id, character_id):
     favorite = Favorite.query.filter_by(user_id=user_id, character_id=character_id).first()
     if favorite == None:
         return jsonify('favorite not found'), 404
     else:
         db.session.delete(favorite)
-        db.session.commit()
+        add_favorite_count('character', character_id, -1)
+        record_changes('favorite', 'delete', [favorite.id], user_id)
+        commit_changes('favorite')
         return jsonify('favorite deleted'), 200
 
 # DELETE FAVORITE PLANET / ELIMINAR PLANETA FAVORITO
-@app.route('/favorite/user/planet/<int:user_id>/<int:planet_id>', methods=['DELETE'])
+@api.route('/favorite/user/planet/<int:user_id>/<int:planet_id>', methods=['DELETE'])
 def delete_one_planet_favorite(user_id, planet_id):
     favorite = Favorite.query.filter_by(user_id=user_id, planet_id=planet_id).first()
     if favorite == None:
         return jsonify('favorite not found'), 404
     else:
         db.session.delete(favorite)
-        db.session.commit()
+        add_favorite_count('planet', planet_id, -1)
+        record_changes('favorite', 'delete', [favorite.id], user_id)
+        commit_changes('favorite')
         return jsonify('favorite deleted'), 200
     
 # DELETE FAVORITE VEHICLE / ELIMINAR VEHICULO FAVORITO
-@app.route('/favorite/user/vehicle/<int:user_id>/<int:vehicle_id>', methods=['DELETE'])
+@api.route('/favorite/user/vehicle/<int:user_id>/<int:vehicle_id>', methods=['DELETE'])
 def delete_one_vehicle_favorite(user_id, vehicle_id):
     favorite = Favorite.query.filter_by(user_id=user_id, vehicle_id=vehicle_id).first()
     if favorite == None:
         return jsonify('favorite not found'), 404
     else:
         db.session.delete(favorite)
-        db.session.commit()
+        add_favorite_count('vehicle', vehicle_id, -1)
+        record_changes('favorite', 'delete', [favorite.id], user_id)
+        commit_changes('favorite')
         return jsonify('favorite deleted'), 200
     
 # PUT CHARACTER / ACTUALIZAR PERSONAJE
 
-# @app.route('/character<int:id>', methods=['PUT'])
+# @api.route('/character<int:id>', methods=['PUT'])
 # def put_character(id):
 #     character = Character.query.filter_by(id=id).first()
 
@@ -403,7 +547,54 @@ def delete_one_vehicle_favorite(user_id, vehicle_id):
 #         db.session.commit()
 #         return jsonify('Character added'), 200
 
+# CREA LA APP; features ES UN CONJUNTO DE ALL_FEATURES (POR DEFECTO EL DE APP_FEATURES)
+def create_app(features=None, config=None):
+    features = features_from_env() if features is None else set(features)
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+    init_json(app)
+
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
+    else:
+        app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['APP_FEATURES'] = sorted(features)
+
+    # LECTURAS EN LAS REPLICAS (DATABASE_REPLICA_URLS), ANTES DE db.init_app PARA REGISTRAR SUS ENGINES
+    replica_router.init_app(app)
+
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            enable_sqlite_foreign_keys(engine)
+    CORS(app)
+    setup_commands(app)
+    init_metrics(app)
+    # LIMITE DE PETICIONES POR CLIENTE (RATE_LIMIT_ENABLED), DESPUES DE LAS METRICAS PARA CONTAR LOS 429
+    rate_limiter.init_app(app)
+    catalog_snapshot.init_app(app)
+    # COMPRESION gzip/br/deflate (COMPRESSION_ENABLED), DESPUES DE LAS METRICAS PARA QUE SU TIEMPO CUENTE
+    response_compressor.init_app(app)
+    app.register_blueprint(api)
+
+    # LAS IMPORTACIONES PESADAS SOLO SE HACEN SI LA PARTE ESTA ACTIVADA
+    if 'migrate' in features:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    if 'admin' in features:
+        from admin import setup_admin
+        setup_admin(app)
+    if 'swagger' in features:
+        app.add_url_rule('/swagger.json', 'swagger_spec', swagger_spec)
+    if 'sitemap' in features:
+        app.add_url_rule('/', 'sitemap', sitemap)
+    return app
+
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3000))
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    create_app().run(host='0.0.0.0', port=PORT, debug=False)
@@ -0,0 +1,222 @@
+"""
+ASGI entry point with an async fast path for the read endpoints.
+
+GET /users, /characters, /planets, /vehicles (full list or ?limit=&after=),
+GET /user/<id>, /character/<id>, /planet/<id>, /vehicle/<id> and
+GET /favorites/user/<id> are served by coroutines on an async SQLAlchemy
+engine, so one worker keeps many of them in flight while waiting on the
+database. Every other request (writes, filters, streaming, admin...) is
+handed to the regular Flask app.
+
+The fast path reads the primary database directly, so requests it would
+serve also go to Flask while the app uses something it does not apply:
+every route with read replicas (DATABASE_REPLICA_URLS), and the catalog
+routes with the response cache (CACHE_ENABLED, on by default) or the
+catalog snapshot (CATALOG_SNAPSHOT).
+
+    $ pipenv install uvicorn aiosqlite asyncpg asgiref
+    $ gunicorn asgi:application -k uvicorn.workers.UvicornWorker --chdir ./src/
+"""
+import re
+import asyncio
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header, parse_etags
+from app import create_app
+from models import User, Character, Planet, Vehicle, Favorite, TableVersion
+from listing import get_page_args, decode_cursor, public_columns
+from serialization import row_serializer
+from etag import compute_etag, matching_etag
+from compression import response_compressor, encoded_etag
+from utils import APIException
+from ratelimit import rate_limiter, retry_after, API_KEY_HEADER
+from replicas import replica_router
+from cache import response_cache
+from snapshot import catalog_snapshot
+
+FAST_PATH_ARGS = {'limit', 'after'}
+
+flask_app = create_app()
+
+def async_database_url(url):
+    for sync_prefix, async_prefix in (
+        ('sqlite:', 'sqlite+aiosqlite:'),
+        ('postgresql+psycopg2:', 'postgresql+asyncpg:'),
+        ('postgresql:', 'postgresql+asyncpg:'),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    raise RuntimeError(f'no async driver configured for {url.split(":")[0]}')
+
+def async_engine_options():
+    # EL POOL ASINCRONO ES AsyncAdaptedQueuePool, NO SE PUEDE USAR TimedQueuePool
+    options = dict(flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    options.pop('poolclass', None)
+    return options
+
+engine = create_async_engine(async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI']), **async_engine_options())
+Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_versions(session, tables):
+    rows = (await session.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    )).all()
+    versions = dict(rows)
+    return [(name, versions.get(name, 0)) for name in tables]
+
+# LOS LISTADOS CONSULTAN SOLO LAS COLUMNAS PUBLICAS, IGUAL QUE listing.build_query
+async def list_items(session, model, args, not_found_message):
+    fields = public_columns(model)
+    serialize = row_serializer(fields)
+    statement = select(*[getattr(model, name) for name in fields]).order_by(model.id)
+    if 'limit' in args or 'after' in args:
+        limit, after = get_page_args(args)
+        statement = statement.limit(limit + 1)
+        if after is not None:
+            statement = statement.where(model.id > decode_cursor(('id', False), after)[1])
+        items = (await session.execute(statement)).all()
+        next_cursor = items[limit - 1].id if len(items) > limit else None
+        return 200, {"results": [serialize(item) for item in items[:limit]], "next": next_cursor}
+
+    items = (await session.execute(statement)).all()
+    if len(items) == 0:
+        return 404, not_found_message
+    return 200, [serialize(item) for item in items]
+
+async def one_item(session, model, id, not_found_message):
+    item = (await session.execute(select(model).where(model.id == id))).scalars().first()
+    if item is None:
+        return 404, not_found_message
+    return 200, item.serialize()
+
+async def user_favorites(session, user_id):
+    user = (await session.execute(
+        select(User).options(*Favorite.eager_options()).where(User.id == user_id)
+    )).scalars().first()
+    if user is None:
+        return 404, 'user not found'
+    user_favorites = user.get_user_favorite()
+    if len(user_favorites["favorites"]) == 0:
+        return 404, 'no favorites found'
+    return 200, user_favorites
+
+# LO QUE FLASK APLICA EN CADA RUTA Y EL CAMINO RAPIDO NO: SI ALGUNO ESTA ACTIVO LA RUTA VA A FLASK
+CATALOG_FEATURES = ('replicas', 'cache', 'snapshot')
+USER_FEATURES = ('replicas',)
+
+# (RUTA, TABLAS DE LAS QUE DEPENDE EL ETAG, FUNCIONES DE FLASK, CORRUTINA)
+ROUTES = [
+    (re.compile(r'^/users/?$'), ('user',), USER_FEATURES, lambda s, a: list_items(s, User, a, 'no users found')),
+    (re.compile(r'^/characters/?$'), ('character',), CATALOG_FEATURES, lambda s, a: list_items(s, Character, a, 'no characters found')),
+    (re.compile(r'^/planets/?$'), ('planet',), CATALOG_FEATURES, lambda s, a: list_items(s, Planet, a, 'no planets found')),
+    (re.compile(r'^/vehicles/?$'), ('vehicle',), CATALOG_FEATURES, lambda s, a: list_items(s, Vehicle, a, 'no vehicles found')),
+    (re.compile(r'^/user/(\d+)/?$'), ('user',), USER_FEATURES, lambda s, a, id: one_item(s, User, int(id), 'user not found')),
+    (re.compile(r'^/character/(\d+)/?$'), ('character',), CATALOG_FEATURES, lambda s, a, id: one_item(s, Character, int(id), 'character not found')),
+    (re.compile(r'^/planet/(\d+)/?$'), ('planet',), CATALOG_FEATURES, lambda s, a, id: one_item(s, Planet, int(id), 'planet not found')),
+    (re.compile(r'^/vehicle/(\d+)/?$'), ('vehicle',), CATALOG_FEATURES, lambda s, a, id: one_item(s, Vehicle, int(id), 'vehicle not found')),
+    (re.compile(r'^/favorites/user/(\d+)/?$'), ('user', 'favorite', 'character', 'planet', 'vehicle'), USER_FEATURES, lambda s, a, id: user_favorites(s, int(id))),
+]
+
+# SE CONSULTA EN CADA PETICION: response_cache.enabled SE PUEDE CAMBIAR CON LA APP EN MARCHA
+def enabled_features():
+    return {
+        'replicas': bool(replica_router.keys),
+        'cache': response_cache.enabled,
+        'snapshot': catalog_snapshot.enabled,
+    }
+
+def match_route(scope):
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+        return None
+    for pattern, tables, features, handler in ROUTES:
+        match = pattern.match(scope['path'])
+        if match:
+            enabled = enabled_features()
+            if any(enabled[feature] for feature in features):
+                return None
+            return tables, handler, match.groups()
+    return None
+
+def json_payload(body):
+    # flask_app.json ES EL PROVEEDOR DE serialization (orjson SI ESTA INSTALADO, SALIDA COMPACTA)
+    return (flask_app.json.dumps(body) + '\n').encode() if body is not None else b''
+
+async def send_json(send, status, body, headers=()):
+    await send_payload(send, status, json_payload(body), headers)
+
+async def send_payload(send, status, payload, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ] + [(name.encode(), value.encode()) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+async def fast_path(scope, send, tables, handler, params):
+    # LA MISMA CABECERA Vary EN EL 304 Y EN EL 200
+    vary = 'Accept, Accept-Encoding' if response_compressor.enabled else 'Accept'
+    headers = {name.decode().lower(): value.decode() for name, value in scope['headers']}
+    args = MultiDict(parse_qsl(scope['query_string'].decode(), keep_blank_values=True))
+    variant = parse_accept_header(headers.get('accept'), MIMEAccept).best or ''
+
+    async with Session() as session:
+        etag = compute_etag(scope['path'], args.items(multi=True), variant, await get_versions(session, tables))
+        # EL MISMO PARSEO Y LA MISMA COMPARACION QUE etag.conditional (W/"..." INCLUIDO)
+        tag = matching_etag(parse_etags(headers.get('if-none-match')), etag)
+        if tag is not None:
+            return await send_json(send, 304, None, [('etag', f'"{tag}"'), ('vary', vary)])
+        try:
+            status, body = await handler(session, args, *params)
+        except APIException as error:
+            return await send_json(send, error.status_code, error.to_dict())
+    if status != 200:
+        return await send_json(send, status, body)
+
+    # LA MISMA COMPRESION QUE EN FLASK (compression.py); EN UN HILO PARA NO BLOQUEAR EL BUCLE DE EVENTOS
+    payload = json_payload(body)
+    extra = [('vary', vary)]
+    encoding = response_compressor.negotiate(headers.get('accept-encoding')) if len(payload) >= response_compressor.min_size else None
+    if encoding is not None:
+        payload = await asyncio.to_thread(response_compressor.compress, payload, encoding)
+        extra += [('etag', f'"{encoded_etag(etag, encoding)}"'), ('content-encoding', encoding)]
+    else:
+        extra += [('etag', f'"{etag}"')]
+    await send_payload(send, status, payload, extra)
+
+# EL MISMO LIMITE DE PETICIONES QUE EN FLASK (before_request NO SE EJECUTA EN EL CAMINO ASINCRONO)
+# DEVUELVE (SEGUNDOS DE ESPERA, CLIENTE SI OCUPO UN HUECO DE CONCURRENCIA)
+def admit(scope):
+    headers = {name.decode().lower(): value.decode() for name, value in scope['headers']}
+    remote_addr = rate_limiter.client_addr(headers.get('x-forwarded-for'), scope['client'][0] if scope.get('client') else None)
+    client = rate_limiter.client_id(headers.get(API_KEY_HEADER.lower()), remote_addr)
+    endpoint = flask_app.url_map.bind('').match(scope['path'], method='GET')[0]
+    wait, acquired = rate_limiter.admit(client, endpoint, flask_app.view_functions.get(endpoint))
+    return wait, client if acquired else None
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+async def application(scope, receive, send):
+    route = match_route(scope)
+    if route is not None:
+        query = dict(parse_qsl(scope['query_string'].decode(), keep_blank_values=True))
+        accept = dict(scope['headers']).get(b'accept', b'')
+        # CUALQUIER OTRO PARAMETRO (FILTROS, ORDEN, CAMPOS, STREAMING) LO RESUELVE FLASK
+        if set(query) <= FAST_PATH_ARGS and b'ndjson' not in accept:
+            tables, handler, params = route
+            wait, client = admit(scope) if rate_limiter.enabled else (0, None)
+            if wait:
+                return await send_json(send, 429, {'message': 'too many requests'}, [('retry-after', retry_after(wait))])
+            try:
+                return await fast_path(scope, send, tables, handler, params)
+            finally:
+                if client is not None:
+                    rate_limiter.store.release(client)
+    return await wsgi_application(scope, receive, send)
@@ -0,0 +1,293 @@
+import json
+from collections import Counter
+from flask import request, jsonify
+from sqlalchemy import insert, update, delete, select, func, or_
+from models import db, User, Character, Planet, Vehicle, Favorite, FavoriteCount
+from utils import APIException
+from changes import commit_changes, record_changes, record_deleted_favorites
+from upsert import add_favorite_counts
+
+MAX_BULK_ROWS = 50000
+# LOS "IN (...)" SE PARTEN EN TROZOS PARA NO PASAR EL LIMITE DE PARAMETROS DE SQLITE
+IN_CHUNK_SIZE = 500
+
+CHARACTER_FIELDS = ['name', 'birth_year', 'gender', 'height', 'eye_color', 'skin_color', 'image']
+PLANET_FIELDS = ['name', 'climate', 'population', 'orbital_period', 'rotation_period', 'diameter', 'image']
+VEHICLE_FIELDS = ['name', 'model', 'size']
+
+# LEE EL CUERPO COMO UN ARRAY JSON O COMO NDJSON (UN OBJETO POR LINEA)
+def read_rows(req):
+    if req.mimetype == 'application/x-ndjson':
+        try:
+            rows = [json.loads(line) for line in req.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            raise APIException('invalid NDJSON body', status_code=400)
+    else:
+        rows = req.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise APIException('body must be a JSON array or NDJSON', status_code=400)
+    if len(rows) > MAX_BULK_ROWS:
+        raise APIException(f'a bulk request accepts at most {MAX_BULK_ROWS} rows', status_code=400)
+    return rows
+
+# MISMAS REGLAS QUE LOS POST DE UN SOLO ELEMENTO
+def validate_row(row, fields):
+    if not isinstance(row, dict):
+        return 'row must be an object'
+    for field in fields:
+        value = row.get(field)
+        if not isinstance(value, str) or len(value.strip()) == 0:
+            return f'"{field}" must be a string'
+    return None
+
+def chunks(items, size=IN_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def existing_values(column, values, *criteria):
+    found = set()
+    for chunk in chunks(values):
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk), *criteria))
+    return found
+
+# ALTA MASIVA: VALIDA TODAS LAS FILAS, COMPRUEBA LOS NOMBRES REPETIDOS CON UN SOLO "IN",
+# INSERTA CON executemany Y CONFIRMA TODO EN UNA SOLA TRANSACCION
+def bulk_create(model, fields, unique_name=False):
+    rows = read_rows(request)
+    results = [None] * len(rows)
+    valid = []
+
+    for index, row in enumerate(rows):
+        error = validate_row(row, fields)
+        if error:
+            results[index] = {"index": index, "status": "error", "error": error}
+        else:
+            valid.append((index, {field: row[field] for field in fields}))
+
+    if unique_name:
+        taken = existing_values(model.name, list({values['name'] for _, values in valid}))
+        accepted = []
+        for index, values in valid:
+            if values['name'] in taken:
+                results[index] = {"index": index, "status": "error", "error": 'This name is already used'}
+            else:
+                # TAMBIEN SE RECHAZAN LOS NOMBRES REPETIDOS DENTRO DEL MISMO LOTE
+                taken.add(values['name'])
+                accepted.append((index, values))
+        valid = accepted
+
+    if valid:
+        # LOS ids NUEVOS SON MAYORES QUE EL MAXIMO ACTUAL (SIN NOMBRE UNICO NO HAY OTRA FORMA DE
+        # ENCONTRARLOS; SI SE CUELA ALGUNO DE OTRA TRANSACCION SOLO SE ANOTA UN upsert DE MAS)
+        last_id = db.session.query(func.max(model.id)).scalar() or 0
+        db.session.execute(insert(model), [values for _, values in valid])
+        ids = {}
+        if unique_name:
+            names = [values['name'] for _, values in valid]
+            for chunk in chunks(names):
+                ids.update({name: row_id for row_id, name in db.session.query(model.id, model.name).filter(model.name.in_(chunk))})
+            record_changes(model.__tablename__, 'upsert', ids.values())
+        else:
+            record_changes(model.__tablename__, 'upsert', [row_id for (row_id,) in db.session.query(model.id).filter(model.id > last_id)])
+        commit_changes(model.__tablename__)
+        for index, values in valid:
+            results[index] = {"index": index, "status": "created", "name": values['name']}
+            if values['name'] in ids:
+                results[index]["id"] = ids[values['name']]
+
+    created = len(valid)
+    return jsonify({
+        "created": created,
+        "errors": len(rows) - created,
+        "results": results,
+    }), 200 if created > 0 or len(rows) == 0 else 400
+
+FAVORITE_KINDS = {
+    'character': (Character, 'character_id'),
+    'planet': (Planet, 'planet_id'),
+    'vehicle': (Vehicle, 'vehicle_id'),
+}
+
+def read_favorite_items(body, key):
+    items = body.get(key, [])
+    if not isinstance(items, list):
+        raise APIException(f'"{key}" must be a list', status_code=400)
+    return items
+
+def validate_favorite_item(item):
+    if not isinstance(item, dict) or item.get('kind') not in FAVORITE_KINDS:
+        return '"kind" must be one of: ' + ', '.join(FAVORITE_KINDS)
+    if not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+        return '"id" must be an integer'
+    return None
+
+# FAVORITOS QUE YA TIENE EL USUARIO ENTRE LOS PEDIDOS: (kind, id) -> favorite.id
+# UNA SOLA CONSULTA (UN IN POR TIPO UNIDOS CON OR) SI LOS ids CABEN EN IN_CHUNK_SIZE; SI NO,
+# POR TIPO Y EN TROZOS, COMO existing_values, PARA NO PASAR DEL LIMITE DE PARAMETROS
+def user_favorites_among(user_id, requested):
+    columns = {kind: getattr(Favorite, column) for kind, (_, column) in FAVORITE_KINDS.items()}
+    if sum(len(ids) for ids in requested.values()) <= IN_CHUNK_SIZE:
+        batches = [{kind: list(ids) for kind, ids in requested.items() if ids}]
+    else:
+        batches = [{kind: chunk} for kind, ids in requested.items() for chunk in chunks(list(ids))]
+    current = {}
+    for batch in batches:
+        if not batch:
+            continue
+        query = db.session.query(Favorite.id, *columns.values()).filter(
+            Favorite.user_id == user_id,
+            or_(*[columns[kind].in_(ids) for kind, ids in batch.items()]),
+        )
+        for favorite_id, *item_ids in query:
+            for kind, item_id in zip(columns, item_ids):
+                if item_id is not None:
+                    current.setdefault((kind, item_id), favorite_id)
+    return current
+
+# SINCRONIZACION MASIVA DE FAVORITOS DE UN USUARIO
+# UNA CONSULTA POR TIPO PARA VALIDAR QUE EXISTEN, UNA SOLA CONSULTA PARA LOS FAVORITOS
+# QUE YA TIENE EL USUARIO (VARIAS SI PASAN DE IN_CHUNK_SIZE ids), Y TODAS LAS ALTAS/BAJAS
+# EN UNA MISMA TRANSACCION
+def bulk_favorites(user_id):
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise APIException('body must be an object with "add" and/or "remove" lists', status_code=400)
+    additions = read_favorite_items(body, 'add')
+    removals = read_favorite_items(body, 'remove')
+    if len(additions) + len(removals) > MAX_BULK_ROWS:
+        raise APIException(f'a bulk request accepts at most {MAX_BULK_ROWS} items', status_code=400)
+
+    if db.session.query(User.id).filter_by(id=user_id).first() is None:
+        return jsonify('user not found'), 404
+
+    results = {"add": [None] * len(additions), "remove": [None] * len(removals)}
+    requested = {kind: set() for kind in FAVORITE_KINDS}
+    for key, items in (('add', additions), ('remove', removals)):
+        for index, item in enumerate(items):
+            error = validate_favorite_item(item)
+            if error:
+                results[key][index] = {"index": index, "status": "error", "error": error}
+            else:
+                requested[item['kind']].add(item['id'])
+
+    current = user_favorites_among(user_id, requested)
+
+    to_insert = []
+    seen = set()
+    for index, item in enumerate(additions):
+        if results['add'][index]:
+            continue
+        kind, item_id = item['kind'], item['id']
+        if (kind, item_id) in current:
+            results['add'][index] = {"index": index, "status": "exists", "kind": kind, "id": item_id}
+        elif (kind, item_id) in seen:
+            results['add'][index] = {"index": index, "status": "duplicate", "kind": kind, "id": item_id}
+        else:
+            seen.add((kind, item_id))
+            to_insert.append((index, kind, item_id))
+
+    # UNA CONSULTA POR TIPO PARA COMPROBAR QUE LOS ELEMENTOS A AÑADIR EXISTEN
+    found = {}
+    for kind, (model, _) in FAVORITE_KINDS.items():
+        ids = list({item_id for _, item_kind, item_id in to_insert if item_kind == kind})
+        found[kind] = existing_values(model.id, ids) if ids else set()
+
+    rows = []
+    for index, kind, item_id in to_insert:
+        if item_id in found[kind]:
+            rows.append({"user_id": user_id, FAVORITE_KINDS[kind][1]: item_id})
+            results['add'][index] = {"index": index, "status": "created", "kind": kind, "id": item_id}
+        else:
+            results['add'][index] = {"index": index, "status": "error", "error": f'{kind} not found', "kind": kind, "id": item_id}
+
+    to_delete = set()
+    for index, item in enumerate(removals):
+        if results['remove'][index]:
+            continue
+        favorite_id = current.get((item['kind'], item['id']))
+        if favorite_id is None:
+            results['remove'][index] = {"index": index, "status": "error", "error": 'favorite not found', "kind": item['kind'], "id": item['id']}
+        else:
+            to_delete.add(favorite_id)
+            results['remove'][index] = {"index": index, "status": "deleted", "kind": item['kind'], "id": item['id']}
+
+    # LAS FILAS DE CADA TIPO TIENEN COLUMNAS DISTINTAS, ASI QUE SE INSERTAN POR SEPARADO
+    for _, column in FAVORITE_KINDS.values():
+        kind_rows = [row for row in rows if column in row]
+        if kind_rows:
+            db.session.execute(insert(Favorite), kind_rows)
+            for chunk in chunks([row[column] for row in kind_rows]):
+                record_changes('favorite', 'upsert', [favorite_id for (favorite_id,) in db.session.query(Favorite.id).filter(
+                    Favorite.user_id == user_id, getattr(Favorite, column).in_(chunk))], user_id)
+    for chunk in chunks(list(to_delete)):
+        db.session.execute(delete(Favorite).where(Favorite.id.in_(chunk)))
+    record_changes('favorite', 'delete', to_delete, user_id)
+    # CONTADORES DE FAVORITOS DE LOS ELEMENTOS AÑADIDOS Y ELIMINADOS
+    deltas = Counter()
+    for result in results['add']:
+        if result['status'] == 'created':
+            deltas[(result['kind'], result['id'])] += 1
+    for result in results['remove']:
+        if result['status'] == 'deleted':
+            deltas[(result['kind'], result['id'])] -= 1
+    add_favorite_counts(deltas)
+    if rows or to_delete:
+        commit_changes('favorite')
+
+    return jsonify({
+        "added": len(rows),
+        "removed": len(to_delete),
+        "results": results,
+    }), 200
+
+# ANTES DE BORRAR USUARIOS O ELEMENTOS (ids, UN TROZO): LOS FAVORITOS LOS BORRA LA BASE (ON DELETE
+# CASCADE); AQUI SE AJUSTAN LOS CONTADORES (LOS DE LOS ELEMENTOS BORRADOS DESAPARECEN Y, AL BORRAR
+# USUARIOS, SE RESTAN SUS FAVORITOS) Y SE ANOTAN ESOS FAVORITOS EN EL REGISTRO DE CAMBIOS
+def remove_favorites_of(model, ids):
+    table = FavoriteCount.__table__
+    kind = model.__tablename__
+    if model is User:
+        record_deleted_favorites(Favorite.user_id.in_(ids))
+        for favorite_kind, column_name in FavoriteCount.KINDS.items():
+            column = getattr(Favorite.__table__.c, column_name)
+            removed = select(func.count()).where(Favorite.__table__.c.user_id.in_(ids), column == table.c.item_id).scalar_subquery()
+            db.session.execute(
+                update(table)
+                .where(table.c.kind == favorite_kind, table.c.item_id.in_(select(column).where(Favorite.__table__.c.user_id.in_(ids))))
+                .values(favorites=table.c.favorites - removed))
+    elif kind in FavoriteCount.KINDS:
+        record_deleted_favorites(getattr(Favorite, FavoriteCount.KINDS[kind]).in_(ids))
+        db.session.execute(delete(table).where(table.c.kind == kind, table.c.item_id.in_(ids)))
+
+# BORRADO POR CONJUNTO: UN "DELETE ... WHERE id IN (...)" POR TROZO SIN CARGAR OBJETOS
+# DEVUELVE EL NUMERO DE FILAS BORRADAS
+def delete_items(model, ids):
+    kind = model.__tablename__
+    deleted = 0
+    for chunk in chunks(list(ids)):
+        remove_favorites_of(model, chunk)
+        rowcount = db.session.execute(delete(model.__table__).where(model.__table__.c.id.in_(chunk))).rowcount
+        # UN id QUE NO EXISTIA SOLO DEJA UNA MARCA DE BORRADO DE MAS (LOS USUARIOS NO SE PUBLICAN)
+        if rowcount and kind in FavoriteCount.KINDS:
+            record_changes(kind, 'delete', chunk)
+        deleted += rowcount
+    return deleted
+
+def read_ids(req):
+    ids = read_rows(req)
+    for item_id in ids:
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            raise APIException('body must be a JSON array of integer ids', status_code=400)
+    return list(dict.fromkeys(ids))
+
+# BAJA MASIVA POR ids (DELETE /characters CON [1, 2, 3]); LOS ids QUE NO EXISTEN SE DEVUELVEN EN "missing"
+def bulk_delete(model):
+    ids = read_ids(request)
+    found = existing_values(model.id, ids)
+    if found:
+        delete_items(model, found)
+        commit_changes(model.__tablename__, 'favorite')
+    return jsonify({
+        "deleted": [item_id for item_id in ids if item_id in found],
+        "missing": [item_id for item_id in ids if item_id not in found],
+    }), 200
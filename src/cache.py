@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response, g
+from models import TableVersion
+from compression import response_compressor
+
+# INTERFAZ DEL BACKEND DE CACHE
+# CUALQUIER ALMACEN CLAVE/VALOR (POR EJEMPLO UN CLIENTE COMPATIBLE CON REDIS)
+# PUEDE USARSE IMPLEMENTANDO ESTOS DOS METODOS
+class CacheBackend:
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+# CACHE EN MEMORIA DEL PROCESO: LRU CON TTL Y NUMERO MAXIMO DE ENTRADAS
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# CACHE DE RESPUESTAS
+# LA CLAVE LLEVA LAS VERSIONES DE LAS TABLAS (namespaces) EN LA BASE DE DATOS (TableVersion), LAS MISMAS
+# DEL ETAG: UNA ESCRITURA DESDE CUALQUIER PROCESO CAMBIA LA CLAVE EN TODOS LOS WORKERS, Y LAS ENTRADAS
+# ANTIGUAS DEJAN DE USARSE Y EL LRU LAS VA DESCARTANDO, SIN TENER QUE RECORRER NI BORRAR CLAVES
+class ResponseCache:
+    def __init__(self, backend=None, ttl=None, enabled=True):
+        self.backend = backend or LRUCache()
+        self.ttl = ttl
+        self.enabled = enabled
+
+    # @conditional YA LEYO LAS VERSIONES (g.table_versions); SIN EL SE CONSULTAN AQUI
+    def versions(self, namespaces):
+        loaded = g.get('table_versions', {})
+        if all(namespace in loaded for namespace in namespaces):
+            return [(namespace, loaded[namespace]) for namespace in namespaces]
+        return TableVersion.get_versions(*namespaces)
+
+    def make_key(self, namespaces):
+        versions = ','.join(f'{namespace}={version}' for namespace, version in self.versions(namespaces))
+        args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+        return f'response:{request.path}?{args}|{versions}'
+
+    # DECORADOR PARA LOS ENDPOINTS GET; namespaces SON LAS TABLAS DE LAS QUE DEPENDE LA RESPUESTA
+    def cached(self, *namespaces):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # LAS PETICIONES NDJSON SIEMPRE SE SIRVEN EN STREAMING, NUNCA DESDE LA CACHE
+                if not self.enabled or request.method != 'GET' or request.accept_mimetypes.best == 'application/x-ndjson':
+                    return view(*args, **kwargs)
+
+                key = self.make_key(namespaces)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    body, status, mimetype = entry
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    return self.encode(key, response)
+
+                response = make_response(view(*args, **kwargs))
+                # NO SE GUARDAN LAS RESPUESTAS EN STREAMING NI LOS ERRORES DEL SERVIDOR
+                if not response.is_streamed and response.status_code < 500:
+                    self.backend.set(key, (response.get_data(), response.status_code, response.mimetype), self.ttl)
+                    return self.encode(key, response)
+                return response
+            return wrapper
+        return decorator
+
+    # CUERPO COMPRIMIDO QUE PIDE EL CLIENTE (compression.py), GUARDADO EN SU PROPIA CLAVE JUNTO A LA
+    # ENTRADA: SE COMPRIME UNA VEZ POR VERSION DE LOS DATOS Y CODIFICACION, NO EN CADA PETICION
+    def encode(self, key, response):
+        encoding = response_compressor.choose(response)
+        if encoding is None:
+            return response
+        encoded_key = f'{key}|{encoding}'
+        data = self.backend.get(encoded_key)
+        if data is None:
+            data = response_compressor.compress(response.get_data(), encoding, best=True)
+            self.backend.set(encoded_key, data, self.ttl)
+        response_compressor.set_encoded(response, data, encoding)
+        return response
+
+response_cache = ResponseCache(
+    backend=LRUCache(
+        max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 1024)),
+        default_ttl=int(os.getenv('CACHE_TTL', 60)),
+    ),
+    enabled=os.getenv('CACHE_ENABLED', '1') not in ('0', 'false'),
+)
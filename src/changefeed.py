@@ -0,0 +1,81 @@
+from flask import request, jsonify
+from models import db, Character, Planet, Vehicle, Favorite, ChangeLog
+from listing import public_columns
+from bulk import chunks
+from serialization import row_serializer
+from utils import APIException
+
+DEFAULT_CHANGES_SIZE = 1000
+MAX_CHANGES_SIZE = 5000
+CHANGE_MODELS = {'character': Character, 'planet': Planet, 'vehicle': Vehicle, 'favorite': Favorite}
+
+def get_int_arg(args, name, default=None, minimum=0, maximum=None):
+    value = args.get(name, default)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise APIException(f'"{name}" must be an integer', status_code=400)
+    if value < minimum or (maximum is not None and value > maximum):
+        raise APIException(f'"{name}" must be between {minimum} and {maximum}' if maximum else f'"{name}" must be at least {minimum}', status_code=400)
+    return value
+
+# FILAS ACTUALES DE LOS ELEMENTOS CREADOS O MODIFICADOS: UNA CONSULTA "IN" POR TIPO
+def current_rows(kind, ids):
+    model = CHANGE_MODELS[kind]
+    names = public_columns(model)
+    serialize = row_serializer(names)
+    rows = {}
+    for chunk in chunks(list(ids)):
+        for row in db.session.query(*[getattr(model, name) for name in names]).filter(model.id.in_(chunk)):
+            rows[row.id] = serialize(row)
+    return rows
+
+# GET /changes?since=<seq>&limit=&user_id=
+# DEVUELVE LOS CAMBIOS CON seq > since EN ORDEN: {"seq", "kind", "id", "op": "upsert" CON "data" | "delete"}
+# SI UN ELEMENTO CAMBIA VARIAS VECES EN LA MISMA PAGINA SOLO SE DEVUELVE SU ULTIMO CAMBIO, Y UN upsert
+# DE UN ELEMENTO QUE YA NO EXISTE SE DEVUELVE COMO delete. LOS FAVORITOS SOLO SE INCLUYEN CON ?user_id=
+# (LOS DE ESE USUARIO); EL BORRADO DE UN PERSONAJE/PLANETA/VEHICULO TAMBIEN BORRA SUS FAVORITOS
+# EL CLIENTE GUARDA "next" Y SIGUE PIDIENDO MIENTRAS "more" SEA true
+# SI since ES ANTERIOR A LOS CAMBIOS QUE SE CONSERVAN (flask prune-changes) DEVUELVE 410 CON "latest":
+# EL CLIENTE DESCARGA LOS LISTADOS COMPLETOS Y CONTINUA DESDE ESE seq
+def changes_response():
+    since = get_int_arg(request.args, 'since', 0)
+    limit = get_int_arg(request.args, 'limit', DEFAULT_CHANGES_SIZE, 1, MAX_CHANGES_SIZE)
+    user_id = get_int_arg(request.args, 'user_id')
+
+    oldest, latest = db.session.query(db.func.min(ChangeLog.seq), db.func.max(ChangeLog.seq)).one()
+    if oldest is not None and since < oldest - 1:
+        return jsonify({"message": 'changes since this sequence number were pruned, download the full lists again', "latest": latest}), 410
+
+    query = ChangeLog.query.filter(ChangeLog.seq > since)
+    if user_id is None:
+        query = query.filter(ChangeLog.kind != 'favorite')
+    else:
+        query = query.filter(db.or_(ChangeLog.kind != 'favorite', ChangeLog.user_id == user_id))
+    entries = query.order_by(ChangeLog.seq).limit(limit + 1).all()
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    last = {}
+    for entry in entries:
+        last[(entry.kind, entry.item_id)] = entry
+    upserts = {kind: [item_id for (item_kind, item_id), entry in last.items() if item_kind == kind and entry.op == 'upsert'] for kind in CHANGE_MODELS}
+    data = {kind: current_rows(kind, ids) if ids else {} for kind, ids in upserts.items()}
+
+    changes = []
+    for entry in sorted(last.values(), key=lambda entry: entry.seq):
+        change = {"seq": entry.seq, "kind": entry.kind, "id": entry.item_id, "op": entry.op}
+        if entry.op == 'upsert':
+            if entry.item_id in data[entry.kind]:
+                change["data"] = data[entry.kind][entry.item_id]
+            else:
+                change["op"] = 'delete'
+        changes.append(change)
+
+    return jsonify({
+        "changes": changes,
+        "next": entries[-1].seq if entries else since,
+        "more": more,
+    }), 200
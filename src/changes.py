@@ -0,0 +1,43 @@
+from datetime import datetime
+from flask import g
+from models import db, TableVersion, ChangeLog, Favorite
+from snapshot import catalog_snapshot
+
+# ANOTA LOS ELEMENTOS CREADOS (upsert) O BORRADOS (delete) PARA EL REGISTRO DE CAMBIOS
+# SOLO SE GUARDAN EN g; SE ESCRIBEN JUNTO CON LA VERSION DE LAS TABLAS (stage_changes)
+def record_changes(kind, op, ids, user_id=None):
+    g.setdefault('pending_changes', []).extend((kind, op, item_id, user_id) for item_id in ids)
+
+# LOS FAVORITOS QUE VA A BORRAR EL ON DELETE CASCADE SE LEEN ANTES DEL DELETE
+def record_deleted_favorites(*criteria):
+    pending = g.setdefault('pending_changes', [])
+    pending.extend(('favorite', 'delete', favorite_id, user_id)
+                   for favorite_id, user_id in db.session.query(Favorite.id, Favorite.user_id).filter(*criteria))
+
+# ESCRIBE LOS CAMBIOS ANOTADOS. ANTES SE SUBE LA VERSION 'change_log', QUE BLOQUEA SU FILA HASTA
+# EL COMMIT: LAS TRANSACCIONES QUE ESCRIBEN EN EL REGISTRO SE CONFIRMAN EN EL ORDEN DE SUS seq,
+# ASI UN CLIENTE QUE YA LEYO HASTA seq=n NUNCA SE PIERDE UN CAMBIO CON UN seq MENOR
+# SE HACE AL FINAL DE LA TRANSACCION Y ANTES QUE LAS DEMAS VERSIONES PARA QUE EL ORDEN DE LOS
+# BLOQUEOS SEA SIEMPRE EL MISMO
+def write_changes():
+    pending = g.pop('pending_changes', [])
+    if not pending:
+        return
+    TableVersion.bump('change_log')
+    now = datetime.utcnow()
+    db.session.execute(db.insert(ChangeLog), [
+        {"kind": kind, "op": op, "item_id": item_id, "user_id": user_id, "created_at": now}
+        for kind, op, item_id, user_id in pending
+    ])
+
+# REGISTRO DE CAMBIOS Y VERSIONES DE LAS TABLAS, SIN CONFIRMAR (EL ADMIN CONFIRMA POR SU CUENTA)
+def stage_changes(*tables):
+    write_changes()
+    TableVersion.bump(*tables)
+
+# SUBE LA VERSION DE LAS TABLAS MODIFICADAS (LAS RESPUESTAS EN CACHE DE ESAS TABLAS DEJAN DE USARSE),
+# CONFIRMA LA TRANSACCION Y ACTUALIZA EL CATALOGO COMPARTIDO
+def commit_changes(*tables):
+    stage_changes(*tables)
+    db.session.commit()
+    catalog_snapshot.refresh(*tables)
@@ -0,0 +1,28 @@
+import click
+from datetime import datetime, timedelta
+from models import db, FavoriteCount, ChangeLog
+from changes import commit_changes
+
+# COMANDOS DE MANTENIMIENTO: flask <comando>
+def setup_commands(app):
+
+    # RECALCULA LOS CONTADORES DE FAVORITOS (POR EJEMPLO DESPUES DE CARGAR FAVORITOS A MANO)
+    @app.cli.command('rebuild-favorite-counts')
+    def rebuild_favorite_counts():
+        FavoriteCount.rebuild()
+        commit_changes('favorite')
+        click.echo(f'{FavoriteCount.query.count()} favorite counters rebuilt')
+
+    # BORRA LOS CAMBIOS MAS ANTIGUOS DEL REGISTRO; SIEMPRE SE CONSERVA EL ULTIMO PARA QUE
+    # GET /changes SEPA QUE LOS CLIENTES CON UN since ANTERIOR TIENEN QUE RESINCRONIZAR (410)
+    @app.cli.command('prune-changes')
+    @click.option('--days', type=float, default=30, show_default=True, help='keep the changes of the last N days')
+    def prune_changes(days):
+        latest = db.session.query(db.func.max(ChangeLog.seq)).scalar()
+        if latest is None:
+            click.echo('0 changes pruned')
+            return
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        pruned = ChangeLog.query.filter(ChangeLog.created_at < cutoff, ChangeLog.seq < latest).delete(synchronize_session=False)
+        commit_changes('change_log')
+        click.echo(f'{pruned} changes pruned')
@@ -0,0 +1,37 @@
+from flask import request, jsonify
+from models import User, Favorite
+from utils import APIException
+
+# ?include=favorites.character,favorites.planet EN GET /user/<id>
+# "favorites" AÑADE LA LISTA DE FAVORITOS Y "favorites.<tipo>" ADEMAS LOS PERSONAJES/PLANETAS/VEHICULOS COMPLETOS
+INCLUDE_KINDS = ('character', 'planet', 'vehicle')
+ALLOWED_INCLUDES = ('favorites',) + tuple('favorites.' + kind for kind in INCLUDE_KINDS)
+
+def get_includes(args):
+    includes = [value.strip() for value in args.get('include', '').split(',') if value.strip()]
+    for value in includes:
+        if value not in ALLOWED_INCLUDES:
+            raise APIException(f'cannot include "{value}", use: ' + ', '.join(ALLOWED_INCLUDES), status_code=400)
+    return [value.split('.', 1)[1] for value in includes if '.' in value]
+
+# DOCUMENTO COMPUESTO: EL USUARIO, SUS FAVORITOS Y EN "included" CADA ELEMENTO FAVORITO UNA SOLA VEZ
+# SIEMPRE SON DOS CONSULTAS (USUARIO + FAVORITOS CON SUS ELEMENTOS, Favorite.eager_options)
+# SIN IMPORTAR CUANTOS FAVORITOS TENGA EL USUARIO
+def compound_user_response(user_id):
+    kinds = get_includes(request.args)
+    user = User.query.options(*Favorite.eager_options()).filter_by(id=user_id).first()
+    if user is None:
+        return jsonify('user not found'), 404
+
+    document = user.get_user_favorite()
+    included = {}
+    for kind in kinds:
+        items = {}
+        for favorite in user.favorites:
+            item = getattr(favorite, kind)
+            if item is not None and item.id not in items:
+                items[item.id] = item.serialize()
+        included[kind] = list(items.values())
+    if included:
+        document["included"] = included
+    return jsonify(document), 200
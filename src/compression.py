@@ -0,0 +1,96 @@
+import os
+import gzip
+import zlib
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli ES OPCIONAL (pipenv install brotli), SIN EL SOLO SE OFRECEN gzip Y deflate
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+# NIVELES DE COMPRESION: (POR PETICION, UNA VEZ POR VERSION DE LOS DATOS EN LA CACHE)
+# LAS RESPUESTAS GUARDADAS SE COMPRIMEN UNA SOLA VEZ, ASI QUE PUEDEN USAR UN NIVEL MAS ALTO
+ENCODERS = {
+    'gzip': lambda data, best: gzip.compress(data, compresslevel=9 if best else 6, mtime=0),
+    'deflate': lambda data, best: zlib.compress(data, 9 if best else 6),
+}
+if brotli is not None:
+    ENCODERS = {'br': lambda data, best: brotli.compress(data, quality=9 if best else 4), **ENCODERS}
+
+# ETAGS DE CADA CODIFICACION: "<etag>-gzip" ES OTRA REPRESENTACION DE "<etag>"
+def encoded_etag(etag, encoding):
+    return f'{etag}-{encoding}'
+
+def etag_variants(etag):
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ENCODERS]
+
+# COMPRESION NEGOCIADA CON Accept-Encoding (br SI ESTA INSTALADO, gzip, deflate)
+# SOLO PARA LOS TIPOS DE TEXTO Y A PARTIR DE min_size BYTES: POR DEBAJO LA CABECERA Y EL
+# TIEMPO DE CPU NO COMPENSAN. LAS RESPUESTAS QUE VIENEN DE LA CACHE YA TRAEN SU VERSION
+# COMPRIMIDA (cache.py) Y AQUI SOLO SE AJUSTAN SU ETag Y Vary
+class ResponseCompressor:
+    def __init__(self, enabled=True, min_size=1024):
+        self.enabled = enabled
+        self.min_size = min_size
+
+    def configure_from_env(self):
+        self.enabled = os.getenv('COMPRESSION_ENABLED', '1') not in ('0', 'false')
+        self.min_size = int(os.getenv('COMPRESSION_MIN_SIZE', self.min_size))
+
+    # LA MEJOR CODIFICACION QUE ACEPTA EL CLIENTE (A IGUAL q, EN EL ORDEN DE ENCODERS) O None
+    def negotiate(self, accept_encoding):
+        if not self.enabled or not accept_encoding:
+            return None
+        return parse_accept_header(accept_encoding).best_match(list(ENCODERS))
+
+    def compress(self, data, encoding, best=False):
+        return ENCODERS[encoding](data, best)
+
+    def is_compressible(self, response):
+        return (
+            self.enabled
+            and response.status_code == 200
+            and not response.is_streamed
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and response.content_length is not None
+            and response.content_length >= self.min_size
+        )
+
+    # CODIFICACION PARA ESTA RESPUESTA EN LA PETICION ACTUAL, O None SI SE ENVIA SIN COMPRIMIR
+    def choose(self, response):
+        if not self.is_compressible(response):
+            return None
+        return self.negotiate(request.headers.get('Accept-Encoding'))
+
+    def set_encoded(self, response, data, encoding):
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+
+    # Vary SE COMPLETA AQUI, DESPUES DE etag.conditional (QUE PONE Accept), PARA QUE EL 304 Y EL 200
+    # LLEVEN LA MISMA CABECERA; EN LOS 200 NO DEPENDE DEL TAMAÑO, QUE EL 304 NO CONOCE
+    def compress_response(self, response):
+        if response.status_code == 304 or (response.status_code == 200 and response.mimetype in COMPRESSIBLE_MIMETYPES):
+            response.vary.add('Accept-Encoding')
+        if response.status_code == 304:
+            return response
+        encoding = self.choose(response)
+        if encoding is not None:
+            self.set_encoded(response, self.compress(response.get_data(), encoding), encoding)
+        encoding = response.headers.get('Content-Encoding')
+        # EL ETag LO PONE etag.conditional ANTES DE COMPRIMIR; CADA CODIFICACION TIENE EL SUYO
+        etag, weak = response.get_etag()
+        if encoding in ENCODERS and etag is not None and not etag.endswith(f'-{encoding}'):
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    def init_app(self, app):
+        self.configure_from_env()
+        if self.enabled:
+            app.after_request(self.compress_response)
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,48 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response, g
+from models import TableVersion
+from compression import etag_variants
+
+def compute_etag(path, args, variant, versions):
+    args = '&'.join(f'{key}={value}' for key, value in sorted(args))
+    versions = ','.join(f'{name}={version}' for name, version in versions)
+    return hashlib.sha1(f'{path}?{args}|{variant}|{versions}'.encode()).hexdigest()
+
+# EL ETAG (O SU VARIANTE COMPRIMIDA) QUE YA TIENE EL CLIENTE SEGUN If-None-Match, O None
+# COMPARACION DEBIL COMO PIDE If-None-Match: W/"<etag>" TAMBIEN VALE (UN PROXY QUE RECOMPRIME LO DEBILITA)
+def matching_etag(if_none_match, etag):
+    for tag in etag_variants(etag):
+        if if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+def make_etag(versions):
+    return compute_etag(request.path, request.args.items(multi=True), request.accept_mimetypes.best or '', versions)
+
+# GET CONDICIONALES (ETag / If-None-Match)
+# EL ETAG SE CALCULA CON LAS VERSIONES DE LAS TABLAS DE LAS QUE DEPENDE LA RESPUESTA
+# (UNA CONSULTA PEQUEÑA), ASI UN 304 NO EJECUTA LA VISTA NI EL SERIALIZADOR
+def conditional(*tables):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = TableVersion.get_versions(*tables)
+            # LA VISTA PUEDE REUTILIZAR ESTAS VERSIONES (snapshot.py)
+            g.table_versions = dict(versions)
+            etag = make_etag(versions)
+            # LA RESPUESTA COMPRIMIDA LLEVA EL ETAG CON SU CODIFICACION ("<etag>-gzip")
+            tag = matching_etag(request.if_none_match, etag)
+            if tag is not None:
+                response = make_response('', 304)
+                response.set_etag(tag)
+                response.vary.add('Accept')
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+import os
+import hashlib
+from functools import wraps
+from datetime import datetime, timedelta
+from flask import request, make_response, current_app
+from models import db, IdempotencyKey
+from upsert import insert_ignore
+from utils import APIException
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# LAS CLAVES SE GUARDAN IDEMPOTENCY_KEY_TTL HORAS; UNA CLAVE QUE SIGUE "EN CURSO" DESPUES DE
+# IDEMPOTENCY_LOCK_TIMEOUT SEGUNDOS SE CONSIDERA ABANDONADA (EL WORKER MURIO) Y SE PUEDE REUTILIZAR
+KEY_TTL = timedelta(hours=float(os.getenv('IDEMPOTENCY_KEY_TTL', 24)))
+LOCK_TIMEOUT = timedelta(seconds=float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 30)))
+
+# LA MISMA CLAVE SOLO SE PUEDE REUTILIZAR CON LA MISMA PETICION (METODO, RUTA Y CUERPO)
+def request_fingerprint():
+    digest = hashlib.sha1()
+    for part in (request.method.encode(), request.full_path.encode(), request.get_data()):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def replay(record):
+    response = current_app.response_class(record.body, status=record.status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+# RESERVA LA CLAVE CON UN INSERT ... ON CONFLICT DO NOTHING CONFIRMADO AL MOMENTO, ASI DOS
+# REINTENTOS SIMULTANEOS NO PUEDEN EJECUTAR LOS DOS LA ESCRITURA
+# DEVUELVE None SI LA CLAVE ES NUEVA O LA RESPUESTA GUARDADA SI YA SE HABIA USADO
+def claim_key(key, fingerprint):
+    now = datetime.utcnow()
+    IdempotencyKey.query.filter(IdempotencyKey.created_at < now - KEY_TTL).delete()
+    IdempotencyKey.query.filter(
+        IdempotencyKey.key == key, IdempotencyKey.status.is_(None), IdempotencyKey.created_at < now - LOCK_TIMEOUT
+    ).delete()
+    claimed = insert_ignore(IdempotencyKey, {"key": key, "fingerprint": fingerprint, "created_at": now}, ['key'])
+    db.session.commit()
+    if claimed is not None:
+        return None
+
+    record = db.session.get(IdempotencyKey, key)
+    if record is None or record.status is None:
+        raise APIException(f'a request with this {IDEMPOTENCY_HEADER} is still in progress', status_code=409)
+    if record.fingerprint != fingerprint:
+        raise APIException(f'this {IDEMPOTENCY_HEADER} was already used for a different request', status_code=422)
+    return replay(record)
+
+def release_key(key):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(key=key, status=None).delete()
+    db.session.commit()
+
+# DECORADOR PARA LOS POST: CON LA CABECERA Idempotency-Key LA PRIMERA RESPUESTA (2xx O 4xx)
+# SE GUARDA Y LOS REINTENTOS LA RECIBEN TAL CUAL; SIN LA CABECERA NO CAMBIA NADA
+# LOS ERRORES 5xx Y LAS EXCEPCIONES LIBERAN LA CLAVE PARA QUE EL CLIENTE PUEDA REINTENTAR
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if len(key) == 0 or len(key) > MAX_KEY_LENGTH:
+            raise APIException(f'{IDEMPOTENCY_HEADER} must be between 1 and {MAX_KEY_LENGTH} characters', status_code=400)
+
+        replayed = claim_key(key, request_fingerprint())
+        if replayed is not None:
+            return replayed
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            release_key(key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            release_key(key)
+            return response
+        IdempotencyKey.query.filter_by(key=key).update({
+            IdempotencyKey.status: response.status_code,
+            IdempotencyKey.body: response.get_data(as_text=True),
+        })
+        db.session.commit()
+        return response
+    return wrapper
@@ -0,0 +1,263 @@
+import json
+import base64
+import binascii
+from flask import request, jsonify, current_app, stream_with_context, Response
+from sqlalchemy.orm.util import identity_key
+from models import db
+from utils import APIException
+from serialization import row_serializer, serialize_rows
+from snapshot import catalog_snapshot, json_bytes_response, CATALOG_TABLES
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+RESERVED_ARGS = ('limit', 'after', 'stream', 'sort', 'fields', 'ids')
+# LOS LISTADOS CON SOLO ESTOS PARAMETROS SE PUEDEN SERVIR DESDE EL CATALOGO COMPARTIDO
+SNAPSHOT_ARGS = ('limit', 'after')
+
+# COLUMNAS QUE SE PUEDEN DEVOLVER (NUNCA LA CONTRASEÑA DEL USUARIO)
+def public_columns(model):
+    hidden = getattr(model, 'HIDDEN_FIELDS', ())
+    return [column.name for column in model.__table__.columns if column.name not in hidden]
+
+# ?fields=name,gender DEVUELVE SOLO ESAS COLUMNAS (EL id SIEMPRE SE INCLUYE)
+def get_fields(model, args):
+    if 'fields' not in args:
+        return None
+    allowed = public_columns(model)
+    fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+    for field in fields:
+        if field not in allowed:
+            raise APIException(f'"{field}" is not a valid field, use: ' + ', '.join(allowed), status_code=400)
+    return ['id'] + [field for field in fields if field != 'id']
+
+# ?gender=male FILTRA POR IGUALDAD, ?name=Lu* POR PREFIJO
+# SOLO SE PERMITEN LAS COLUMNAS INDEXADAS QUE DECLARA CADA MODELO EN FILTERABLE
+def apply_filters(query, model, args):
+    filterable = getattr(model, 'FILTERABLE', ())
+    for name in args:
+        if name in RESERVED_ARGS:
+            continue
+        if name not in filterable:
+            raise APIException(f'cannot filter by "{name}"' + (', use: ' + ', '.join(filterable) if filterable else ''), status_code=400)
+        column = getattr(model, name)
+        values = args.getlist(name)
+        for value in values:
+            if value.endswith('*') and isinstance(column.type, db.String):
+                query = query.filter(column.startswith(value[:-1], autoescape=True))
+            else:
+                query = query.filter(column == coerce_value(column, name, value))
+    return query
+
+# EL VALOR DEL QUERY STRING CON EL TIPO DE LA COLUMNA (?size=abc EN UNA COLUMNA ENTERA ES UN 400,
+# NO UN ERROR DE LA BASE AL CONVERTIRLO); EL PREFIJO (*) SOLO EXISTE EN LAS COLUMNAS DE TEXTO
+def coerce_value(column, name, value):
+    python_type = column.type.python_type
+    if python_type is str:
+        return value
+    try:
+        return python_type(value)
+    except ValueError:
+        raise APIException(f'"{name}" must be of type {python_type.__name__}', status_code=400)
+
+# ?sort=name ASCENDENTE, ?sort=-name DESCENDENTE; EL id SE USA SIEMPRE PARA DESEMPATAR
+def get_sort(model, args):
+    sort = args.get('sort', 'id')
+    descending = sort.startswith('-')
+    name = sort.lstrip('-')
+    sortable = getattr(model, 'SORTABLE', ('id',))
+    if name not in sortable:
+        raise APIException(f'cannot sort by "{name}", use: ' + ', '.join(sortable), status_code=400)
+    return name, descending
+
+def order_query(query, model, sort):
+    name, descending = sort
+    column = getattr(model, name)
+    if name == 'id':
+        return query.order_by(column.desc() if descending else column)
+    return query.order_by(column.desc() if descending else column, model.id)
+
+# EL CURSOR ES EL id CUANDO SE ORDENA POR id (COMPATIBLE CON LA VERSION ANTERIOR)
+# Y UN TEXTO OPACO CON (valor, id) CUANDO SE ORDENA POR OTRA COLUMNA
+def encode_cursor(sort, value, item_id):
+    if sort[0] == 'id':
+        return item_id
+    return base64.urlsafe_b64encode(json.dumps([value, item_id]).encode()).decode()
+
+def decode_cursor(sort, after):
+    try:
+        if sort[0] == 'id':
+            return None, int(after)
+        value, item_id = json.loads(base64.urlsafe_b64decode(after.encode()))
+        return value, int(item_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise APIException('"after" is not a valid cursor', status_code=400)
+
+def get_page_args(args):
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise APIException('"limit" must be an integer', status_code=400)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise APIException(f'"limit" must be between 1 and {MAX_PAGE_SIZE}', status_code=400)
+    return limit, args.get('after')
+
+# PAGINACION POR CURSOR (KEYSET)
+# "WHERE (col, id) > (valor, id) ORDER BY col, id LIMIT n" RECORRE EL INDICE, ASI QUE EL
+# COSTE ES EL MISMO PARA LA PRIMERA PAGINA QUE PARA LA PAGINA UN MILLON
+def keyset_page(query, model, limit, after=None, sort=('id', False)):
+    name, descending = sort
+    if after is not None:
+        value, after_id = decode_cursor(sort, after)
+        if name == 'id':
+            query = query.filter(model.id < after_id if descending else model.id > after_id)
+        else:
+            column = getattr(model, name)
+            beyond = column < value if descending else column > value
+            query = query.filter(db.or_(beyond, db.and_(column == value, model.id > after_id)))
+    # PEDIMOS UNA FILA DE MAS PARA SABER SI HAY SIGUIENTE PAGINA
+    items = order_query(query, model, sort).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        last = items[limit - 1]
+        next_cursor = encode_cursor(sort, getattr(last, name), last.id)
+    return items[:limit], next_cursor
+
+def is_paginated(args):
+    return 'limit' in args or 'after' in args
+
+def wants_stream(req):
+    return req.args.get('stream') in ('1', 'true') or req.accept_mimetypes.best == NDJSON_MIMETYPE
+
+# SE CONSULTAN SOLO LAS COLUMNAS QUE SE DEVUELVEN (TUPLAS, SIN OBJETOS DEL ORM)
+# SIN ?fields SON TODAS LAS COLUMNAS PUBLICAS, LAS MISMAS CLAVES QUE serialize()
+# LA COLUMNA DE ORDEN SE AÑADE AL FINAL PARA PODER CONSTRUIR EL CURSOR
+def build_query(model, fields, sort):
+    if fields is None:
+        fields = public_columns(model)
+    columns = fields + ([sort[0]] if sort[0] not in fields else [])
+    query = db.session.query(*[getattr(model, name) for name in columns])
+    return query, row_serializer(fields)
+
+# RESPUESTA EN STREAMING PARA DESCARGAR TABLAS COMPLETAS
+# yield_per TRAE LAS FILAS DEL SERVIDOR EN LOTES Y CADA FILA SE CODIFICA Y SE ENVIA
+# AL MOMENTO, ASI LA MEMORIA POR WORKER NO CRECE CON EL TAMAÑO DE LA TABLA
+def stream_response(query, model, serialize, ndjson=False, sort=('id', False)):
+    dumps = current_app.json.dumps
+    rows = order_query(query, model, sort).yield_per(STREAM_BATCH_SIZE)
+
+    def generate_ndjson():
+        for item in rows:
+            yield dumps(serialize(item)) + '\n'
+
+    def generate_array():
+        yield '['
+        separator = ''
+        for item in rows:
+            yield separator + dumps(serialize(item))
+            separator = ','
+        yield ']'
+
+    if ndjson:
+        return Response(stream_with_context(generate_ndjson()), mimetype=NDJSON_MIMETYPE)
+    return Response(stream_with_context(generate_array()), mimetype='application/json')
+
+# ?ids=1,2,3 -> [1, 2, 3] (SIN REPETIDOS, EN EL ORDEN PEDIDO)
+def get_ids(args):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in args['ids'].split(',') if value.strip()))
+    except ValueError:
+        raise APIException('"ids" must be a comma separated list of integers', status_code=400)
+    if len(ids) == 0 or len(ids) > MAX_PAGE_SIZE:
+        raise APIException(f'"ids" must have between 1 and {MAX_PAGE_SIZE} ids', status_code=400)
+    for name in args:
+        if name not in ('ids', 'fields'):
+            raise APIException(f'"ids" cannot be combined with "{name}"', status_code=400)
+    return ids
+
+# VARIOS ELEMENTOS POR id CON UNA SOLA CONSULTA "IN"; LOS QUE YA ESTAN CARGADOS EN LA
+# SESION (IDENTITY MAP) NO SE VUELVEN A PEDIR. DEVUELVE {id: objeto} DE LOS QUE EXISTEN
+def get_many(model, ids):
+    found = {}
+    for item_id in ids:
+        item = db.session.identity_map.get(identity_key(model, item_id))
+        if item is not None:
+            found[item_id] = item
+    missing = [item_id for item_id in ids if item_id not in found]
+    if missing:
+        for item in model.query.filter(model.id.in_(missing)):
+            found[item.id] = item
+    return found
+
+# ?ids=1,2,3 EN LOS ENDPOINTS DE LISTADO: LOS ELEMENTOS EN EL ORDEN PEDIDO Y LOS ids QUE NO EXISTEN
+def multi_get_response(model, args):
+    ids = get_ids(args)
+    fields = get_fields(model, args)
+    found = get_many(model, ids)
+    results = serialize_rows(lambda item: item.serialize(), [found[item_id] for item_id in ids if item_id in found])
+    if fields is not None:
+        results = [{name: item[name] for name in fields} for item in results]
+    return jsonify({
+        "results": results,
+        "missing": [item_id for item_id in ids if item_id not in found],
+    }), 200
+
+# LISTADO COMPLETO O PAGINA POR id DESDE EL CATALOGO COMPARTIDO (snapshot.py): LAS FILAS
+# YA ESTAN EN JSON Y SON CONTIGUAS, ASI QUE LA RESPUESTA ES UN SOLO TROZO DEL ARCHIVO
+# DEVUELVE None SI EL MODELO NO ESTA EN EL CATALOGO O EL ARCHIVO NO ESTA AL DIA
+def snapshot_response(model, not_found_message):
+    table = model.__tablename__
+    if table not in CATALOG_TABLES:
+        return None
+    snapshot = catalog_snapshot.current(table)
+    if snapshot is None:
+        return None
+    count = snapshot.count(table)
+    if not is_paginated(request.args):
+        if count == 0:
+            return jsonify(not_found_message), 404
+        return json_bytes_response(b'[' + snapshot.rows(table, 0, count) + b']')
+
+    limit, after = get_page_args(request.args)
+    start = snapshot.bisect(table, decode_cursor(('id', False), after)[1]) if after is not None else 0
+    stop = min(start + limit, count)
+    next_cursor = str(snapshot.last_id(table, stop - 1)).encode() if stop < count else b'null'
+    return json_bytes_response(b'{"next":' + next_cursor + b',"results":[' + snapshot.rows(table, start, stop) + b']}')
+
+# RESPUESTA COMUN DE LOS ENDPOINTS DE LISTADO (/users, /characters, /planets, /vehicles)
+# ?stream=1 (O "Accept: application/x-ndjson") DEVUELVE LA TABLA COMPLETA EN STREAMING
+# ?gender=male&name=Lu*  FILTROS, ?sort=-name ORDEN, ?fields=name,gender COLUMNAS
+# ?ids=1,2,3 DEVUELVE ESOS ELEMENTOS (multi_get_response)
+# SIN ?limit NI ?after SE MANTIENE LA RESPUESTA ORIGINAL (LA TABLA COMPLETA)
+def list_response(model, not_found_message):
+    if 'ids' in request.args:
+        return multi_get_response(model, request.args)
+    if set(request.args) <= set(SNAPSHOT_ARGS) and not wants_stream(request):
+        response = snapshot_response(model, not_found_message)
+        if response is not None:
+            return response
+    fields = get_fields(model, request.args)
+    sort = get_sort(model, request.args)
+    query, serialize = build_query(model, fields, sort)
+    query = apply_filters(query, model, request.args)
+
+    if wants_stream(request):
+        ndjson = request.accept_mimetypes.best == NDJSON_MIMETYPE
+        return stream_response(query, model, serialize, ndjson=ndjson, sort=sort)
+
+    if is_paginated(request.args):
+        limit, after = get_page_args(request.args)
+        items, next_cursor = keyset_page(query, model, limit, after, sort)
+        return jsonify({
+            "results": serialize_rows(serialize, items),
+            "next": next_cursor,
+        }), 200
+
+    items = order_query(query, model, sort).all()
+    if len(items) == 0:
+        return jsonify(not_found_message), 404
+    else:
+        data_serialized = serialize_rows(serialize, items)
+        return jsonify(data_serialized), 200
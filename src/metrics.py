@@ -0,0 +1,153 @@
+import time
+import threading
+from functools import wraps
+from flask import g, request, has_app_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# TIEMPOS DE LA PETICION EN CURSO (SE GUARDAN EN flask.g)
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+
+def current_timings():
+    if has_app_context():
+        return g.get('request_timings')
+    return None
+
+# ACUMULADO POR ENDPOINT, EXPORTADO EN FORMATO DE TEXTO DE PROMETHEUS
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, method, status, timings, duration):
+        with self._lock:
+            stats = self._endpoints.setdefault((endpoint, method), {
+                "statuses": {},
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "count": 0,
+                "duration": 0.0,
+                "queries": 0,
+                "db_time": 0.0,
+                "serialize_time": 0.0,
+            })
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats["buckets"][index] += 1
+            stats["count"] += 1
+            stats["duration"] += duration
+            stats["queries"] += timings.queries
+            stats["db_time"] += timings.db_time
+            stats["serialize_time"] += timings.serialize_time
+
+    def render(self):
+        lines = [
+            '# HELP api_requests_total Requests handled, by endpoint, method and status.',
+            '# TYPE api_requests_total counter',
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for (endpoint, method), stats in endpoints:
+                for status, count in sorted(stats["statuses"].items()):
+                    lines.append(f'api_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP api_request_duration_seconds Wall time per request.',
+                '# TYPE api_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), stats in endpoints:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    lines.append(f'api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+                lines.append(f'api_request_duration_seconds_sum{{{labels}}} {stats["duration"]:.6f}')
+                lines.append(f'api_request_duration_seconds_count{{{labels}}} {stats["count"]}')
+
+            for name, key, kind, help_text in (
+                ('api_db_queries_total', 'queries', 'counter', 'SQL statements executed.'),
+                ('api_db_seconds_total', 'db_time', 'counter', 'Time spent executing SQL statements.'),
+                ('api_serialize_seconds_total', 'serialize_time', 'counter', 'Time spent in model serialize() methods.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (endpoint, method), stats in endpoints:
+                    value = stats[key] if key == 'queries' else f'{stats[key]:.6f}'
+                    lines.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics_registry = MetricsRegistry()
+
+# NUMERO Y TIEMPO DE LAS CONSULTAS SQL (EVENTOS DE SQLALCHEMY, VALEN PARA CUALQUIER ENGINE)
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(conn.info['query_start'].pop())
+
+# SI LA CONSULTA FALLA after_cursor_execute NO SE EJECUTA: SE SACA AQUI SU INICIO PARA QUE NO SE
+# QUEDE EN LA CONEXION DEL POOL Y LAS SIGUIENTES CONSULTAS NO SE EMPAREJEN CON UN INICIO EQUIVOCADO
+# (SI EL ERROR ES DESPUES, AL LEER LAS FILAS, LA LISTA YA ESTA VACIA)
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        record_query(starts.pop())
+
+def record_query(started):
+    timings = current_timings()
+    if timings is not None:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - started
+
+# DECORADOR PARA LOS METODOS serialize() DE LOS MODELOS
+# SOLO CUENTA LA LLAMADA MAS EXTERNA PARA NO SUMAR DOS VECES LAS ANIDADAS
+def timed_serialize(method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        timings = current_timings()
+        if timings is None:
+            return method(*args, **kwargs)
+        timings.serialize_depth += 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.serialize_depth -= 1
+            if timings.serialize_depth == 0:
+                timings.serialize_time += time.perf_counter() - start
+    return wrapper
+
+def server_timing(timings, duration):
+    return ', '.join([
+        f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries"',
+        f'serialize;dur={timings.serialize_time * 1000:.2f}',
+        f'total;dur={duration * 1000:.2f}',
+    ])
+
+def init_metrics(app):
+    @app.before_request
+    def start_request_timings():
+        g.request_timings = RequestTimings()
+
+    @app.after_request
+    def record_request_timings(response):
+        timings = g.get('request_timings')
+        if timings is None:
+            return response
+        duration = time.perf_counter() - timings.start
+        response.headers['Server-Timing'] = server_timing(timings, duration)
+        metrics_registry.observe(request.endpoint or 'unmatched', request.method, response.status_code, timings, duration)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from metrics import timed_serialize
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # USER
 class User(db.Model):
@@ -11,13 +13,18 @@ class User(db.Model):
     password = db.Column(db.String(80), nullable=False)
     subscription_date = db.Column(db.Date, nullable=False)
 
-    favorites = db.relationship('Favorite', backref = 'user', lazy = True)
+    favorites = db.relationship('Favorite', backref = 'user', lazy = True, cascade = 'all, delete', passive_deletes = True)
     # REFERENCIA A LA RELACION ENTRE LA TABLA USER Y FAVORITE
+    # passive_deletes: AL BORRAR EL USUARIO NO SE CARGAN SUS FAVORITOS, LOS BORRA LA BASE (ON DELETE CASCADE)
+
+    # COLUMNAS QUE NUNCA SE DEVUELVEN EN LOS LISTADOS (?fields=)
+    HIDDEN_FIELDS = ('password',)
 
     def __repr__(self):
         return f'Email: {self.email} - ID: {self.id}' # ALTERNATIVA A ['<User %r>' % self.email] PARA COMPLEMENTAR EMAIL CON ID
             # '<User %r>' % self.email
 
+    @timed_serialize
     def serialize(self):
         return {
             "id": self.id,
@@ -29,6 +36,7 @@ class User(db.Model):
         }
     
     # MOSTRAR DATOS DEL USUARIO Y SU LISTA DE FAVORITOS DEL USUAIRO
+    @timed_serialize
     def get_user_favorite(self):
         return {
             "user": self.serialize(),
@@ -49,11 +57,21 @@ class Character(db.Model):
     image = db.Column(db.String(500), nullable=False)
 
 
-    favorite = db.relationship('Favorite', backref = 'character', lazy = True)
+    favorite = db.relationship('Favorite', backref = 'character', lazy = True, cascade = 'all, delete', passive_deletes = True)
+
+    # FILTROS (?gender=male) Y ORDEN (?sort=name) PERMITIDOS, SOLO SOBRE COLUMNAS INDEXADAS
+    FILTERABLE = ('name', 'gender', 'eye_color', 'skin_color')
+    SORTABLE = ('id', 'name', 'gender', 'eye_color', 'skin_color')
+    __table_args__ = (
+        db.Index('ix_character_gender', 'gender', 'id'),
+        db.Index('ix_character_eye_color', 'eye_color', 'id'),
+        db.Index('ix_character_skin_color', 'skin_color', 'id'),
+    )
 
     def __repr__(self):
         return '<Character %r>' % self.name
 
+    @timed_serialize
     def serialize(self):
         return {
             "id": self.id,
@@ -78,11 +96,18 @@ class Planet(db.Model):
     diameter = db.Column(db.String(250), nullable=False)
     image = db.Column(db.String(250), nullable=False)
 
-    favorite = db.relationship('Favorite', backref = 'planet', lazy = True)
+    favorite = db.relationship('Favorite', backref = 'planet', lazy = True, cascade = 'all, delete', passive_deletes = True)
+
+    FILTERABLE = ('name', 'climate')
+    SORTABLE = ('id', 'name', 'climate')
+    __table_args__ = (
+        db.Index('ix_planet_climate', 'climate', 'id'),
+    )
 
     def __repr__(self):
         return '<Planet %r>' % self.name
 
+    @timed_serialize
     def serialize(self):
         return {
             "id": self.id,
@@ -102,11 +127,20 @@ class Vehicle(db.Model):
     model = db.Column(db.String(250), nullable=False)
     size = db.Column(db.Integer, nullable=False)
     
-    favorite = db.relationship('Favorite', backref = 'vehicle', lazy = True)
+    favorite = db.relationship('Favorite', backref = 'vehicle', lazy = True, cascade = 'all, delete', passive_deletes = True)
+
+    FILTERABLE = ('name', 'model', 'size')
+    SORTABLE = ('id', 'name', 'model', 'size')
+    __table_args__ = (
+        db.Index('ix_vehicle_name', 'name', 'id'),
+        db.Index('ix_vehicle_model', 'model', 'id'),
+        db.Index('ix_vehicle_size', 'size', 'id'),
+    )
 
     def __repr__(self):
         return '<Vehicle %r>' % self.name
 
+    @timed_serialize
     def serialize(self):
         return {
             "id": self.id,
@@ -119,27 +153,147 @@ class Vehicle(db.Model):
 class Favorite(db.Model):
     # __tablename__ = 'favorite'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    character_id = db.Column(db.Integer, db.ForeignKey('character.id'))
-    planet_id = db.Column(db.Integer, db.ForeignKey('planet.id'))
-    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    character_id = db.Column(db.Integer, db.ForeignKey('character.id', ondelete='CASCADE'))
+    planet_id = db.Column(db.Integer, db.ForeignKey('planet.id', ondelete='CASCADE'))
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id', ondelete='CASCADE'))
+
+    # INDICE PARA CARGAR LOS FAVORITOS DE UN USUARIO Y UN INDICE UNICO PARCIAL POR TIPO:
+    # SOLO INCLUYE LAS FILAS DE ESE TIPO Y EVITA FAVORITOS REPETIDOS
+    # LOS INDICES POR ELEMENTO LOS USA EL ON DELETE CASCADE PARA ENCONTRAR SUS FAVORITOS SIN RECORRER LA TABLA
+    __table_args__ = (
+        db.Index('ix_favorite_user_id', 'user_id'),
+        db.Index('ix_favorite_character_id', 'character_id',
+                 sqlite_where=db.text('character_id IS NOT NULL'), postgresql_where=db.text('character_id IS NOT NULL')),
+        db.Index('ix_favorite_planet_id', 'planet_id',
+                 sqlite_where=db.text('planet_id IS NOT NULL'), postgresql_where=db.text('planet_id IS NOT NULL')),
+        db.Index('ix_favorite_vehicle_id', 'vehicle_id',
+                 sqlite_where=db.text('vehicle_id IS NOT NULL'), postgresql_where=db.text('vehicle_id IS NOT NULL')),
+        db.Index('uq_favorite_user_character', 'user_id', 'character_id', unique=True,
+                 sqlite_where=db.text('character_id IS NOT NULL'), postgresql_where=db.text('character_id IS NOT NULL')),
+        db.Index('uq_favorite_user_planet', 'user_id', 'planet_id', unique=True,
+                 sqlite_where=db.text('planet_id IS NOT NULL'), postgresql_where=db.text('planet_id IS NOT NULL')),
+        db.Index('uq_favorite_user_vehicle', 'user_id', 'vehicle_id', unique=True,
+                 sqlite_where=db.text('vehicle_id IS NOT NULL'), postgresql_where=db.text('vehicle_id IS NOT NULL')),
+    )
 
     def __repr__(self):
         return '<Favorite %r>' % self.id
         # return f"User: {str(self.user_id)}{' - Character: ' + str(self.character_id) if self.character_id else ''}{' - Planet: ' + str(self.planet_id) if self.planet_id else ''}{' - Vehicle: ' + str(self.vehicle_id) if self.vehicle_id else ''}"
         # EVITAR MOSTRAR DATOS DE LOS CAMPOS VACIOS
 
+    @timed_serialize
     def serialize(self):
-        character = Character.query.filter_by(id=self.character_id).first()
-        planet = Planet.query.filter_by(id=self.planet_id).first()
-        vehicle = Vehicle.query.filter_by(id=self.vehicle_id).first()
-
-        print(character.serialize()["name"])
+        # USA LAS RELACIONES (backref) EN LUGAR DE UNA CONSULTA POR FAVORITO
         if self.character_id:
-            return {"character": self.character_id, "name": character.serialize()["name"] , "id": self.id, "user": self.user_id}
+            return {"character": self.character_id, "name": self.character.name, "id": self.id, "user": self.user_id}
         elif self.planet_id:
-            return {"planet": self.planet_id, "name": planet.serialize()["name"], "id": self.id, "user": self.user_id}
+            return {"planet": self.planet_id, "name": self.planet.name, "id": self.id, "user": self.user_id}
         elif self.vehicle_id:
-            return {"vehicle": self.vehicle_id, "name": vehicle.serialize()["name"], "id": self.id, "user": self.user_id}
+            return {"vehicle": self.vehicle_id, "name": self.vehicle.name, "id": self.id, "user": self.user_id}
         else:
             return {"id": self.id, "user": self.user_id}
+
+    # CARGA LOS FAVORITOS JUNTO CON EL PERSONAJE/PLANETA/VEHICULO EN UNA SOLA CONSULTA
+    @staticmethod
+    def eager_options():
+        return [
+            db.selectinload(User.favorites).joinedload(Favorite.character),
+            db.selectinload(User.favorites).joinedload(Favorite.planet),
+            db.selectinload(User.favorites).joinedload(Favorite.vehicle),
+        ]
+
+# CONTADORES DE FAVORITOS POR PERSONAJE, PLANETA Y VEHICULO
+# SE ACTUALIZAN EN LA MISMA TRANSACCION QUE LOS FAVORITOS; CON EL INDICE (kind, favorites, item_id)
+# LOS k MAS FAVORITOS SE LEEN SIN RECORRER LA TABLA FAVORITE
+class FavoriteCount(db.Model):
+    __tablename__ = 'favorite_count'
+    kind = db.Column(db.String(20), primary_key=True)
+    item_id = db.Column(db.Integer, primary_key=True)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_favorite_count_top', 'kind', 'favorites', 'item_id'),
+    )
+
+    # TIPO -> COLUMNA DE FAVORITE
+    KINDS = {'character': 'character_id', 'planet': 'planet_id', 'vehicle': 'vehicle_id'}
+
+    def __repr__(self):
+        return '<FavoriteCount %r %r=%r>' % (self.kind, self.item_id, self.favorites)
+
+    # RECALCULA TODOS LOS CONTADORES DESDE LA TABLA FAVORITE (flask rebuild-favorite-counts)
+    @staticmethod
+    def rebuild():
+        FavoriteCount.query.delete()
+        for kind, column in FavoriteCount.KINDS.items():
+            item_id = getattr(Favorite, column)
+            db.session.execute(db.insert(FavoriteCount).from_select(
+                ['kind', 'item_id', 'favorites'],
+                db.select(db.literal(kind), item_id, db.func.count()).where(item_id.isnot(None)).group_by(item_id),
+            ))
+
+# VERSIONES DE LAS TABLAS
+# CADA ESCRITURA SUBE LA VERSION DE LAS TABLAS QUE MODIFICA EN LA MISMA TRANSACCION;
+# LOS GET LA USAN PARA GENERAR EL ETAG SIN TENER QUE SERIALIZAR LA RESPUESTA
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<TableVersion %r=%r>' % (self.name, self.version)
+
+    @staticmethod
+    def bump(*names):
+        for name in names:
+            updated = TableVersion.query.filter_by(name=name).update({TableVersion.version: TableVersion.version + 1})
+            if updated == 0:
+                db.session.add(TableVersion(name=name, version=1))
+
+    @staticmethod
+    def get_versions(*names):
+        rows = db.session.query(TableVersion.name, TableVersion.version).filter(TableVersion.name.in_(names)).all()
+        versions = dict(rows)
+        return [(name, versions.get(name, 0)) for name in names]
+
+# RESPUESTAS GUARDADAS POR Idempotency-Key
+# UN REINTENTO CON LA MISMA CLAVE DEVUELVE LA RESPUESTA GUARDADA SIN VOLVER A ESCRIBIR;
+# status ES NULL MIENTRAS LA PRIMERA PETICION SIGUE EN CURSO
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.Integer)
+    body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return '<IdempotencyKey %r>' % self.key
+
+# REGISTRO DE CAMBIOS PARA LA SINCRONIZACION INCREMENTAL (GET /changes?since=)
+# UNA FILA POR ELEMENTO CREADO/MODIFICADO (upsert) O BORRADO (delete); seq SOLO CRECE
+# (AUTOINCREMENT EN SQLITE PARA QUE NO SE REUTILICEN LOS NUMEROS AL PURGAR)
+# user_id ES EL DUEÑO DEL FAVORITO EN LAS FILAS DE TIPO favorite
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+    seq = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_change_log_created_at', 'created_at'),
+        {'sqlite_autoincrement': True},
+    )
+
+    KINDS = ('character', 'planet', 'vehicle', 'favorite')
+
+    def __repr__(self):
+        return '<ChangeLog %r %s %r %r>' % (self.seq, self.op, self.kind, self.item_id)
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import threading
+from sqlalchemy import exc, event
+from sqlalchemy.pool import Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# METRICAS DEL POOL: CONEXIONES ABIERTAS, CHECKOUTS, TIMEOUTS Y TIEMPO DE ESPERA
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, engine):
+        pool = engine.pool
+        stats = {
+            "pid": os.getpid(),
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+pool_metrics = PoolMetrics()
+
+# QueuePool QUE MIDE CUANTO TIEMPO SE ESPERA POR UNA CONEXION LIBRE
+# (_do_get ES EL METODO QUE SE BLOQUEA CUANDO EL POOL ESTA AGOTADO)
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.record_checkout(time.perf_counter() - start)
+
+    def _create_connection(self):
+        pool_metrics.record_connect()
+        return super()._create_connection()
+
+def env_flag(name, default):
+    return os.getenv(name, default) not in ('0', 'false', 'False')
+
+# OPCIONES DEL ENGINE LEIDAS DEL ENTORNO
+# pool_pre_ping Y pool_recycle EVITAN USAR CONEXIONES QUE EL SERVIDOR YA CERRO;
+# EL TAMAÑO SE AJUSTA POR WORKER: (DB_POOL_SIZE + DB_MAX_OVERFLOW) * WORKERS <= max_connections
+def engine_options_from_env(db_url):
+    options = {
+        "pool_pre_ping": env_flag('DB_POOL_PRE_PING', '1'),
+        "pool_recycle": int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    # SQLITE USA SU PROPIO POOL (UNA CONEXION POR HILO/ARCHIVO), SIN OPCIONES DE TAMAÑO
+    if db_url.startswith('sqlite'):
+        return options
+    options.update({
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv('DB_POOL_SIZE', 5)),
+        "max_overflow": int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        "pool_timeout": float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    })
+    return options
+
+def log_pool_stats(engine):
+    logger.info('db pool stats %s', pool_metrics.snapshot(engine))
+
+# CON gunicorn --preload LOS WORKERS SE CREAN CON fork() DESPUES DE IMPORTAR LA APP
+# UNA CONEXION ABIERTA EN OTRO PROCESO NO SE PUEDE REUTILIZAR: SE DESCARTA Y EL POOL ABRE OTRA
+@event.listens_for(Pool, 'connect')
+def remember_connection_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+@event.listens_for(Pool, 'checkout')
+def check_connection_pid(dbapi_connection, connection_record, connection_proxy):
+    pid = os.getpid()
+    if connection_record.info.get('pid', pid) != pid:
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise exc.DisconnectionError(
+            'connection record belongs to pid %s, attempting to check out in pid %s' % (connection_record.info['pid'], pid)
+        )
+
+# SQLITE NO APLICA LAS FOREIGN KEYS (NI ON DELETE CASCADE) SI NO SE ACTIVAN EN CADA CONEXION
+def enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+def enable_sqlite_foreign_keys(engine):
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', enable_foreign_keys)
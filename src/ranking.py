@@ -0,0 +1,30 @@
+from flask import request, jsonify
+from models import db, FavoriteCount
+from listing import public_columns
+from serialization import row_serializer, serialize_rows
+from utils import APIException
+
+DEFAULT_TOP_SIZE = 10
+MAX_TOP_SIZE = 100
+
+def get_top_limit(args):
+    try:
+        limit = int(args.get('limit', DEFAULT_TOP_SIZE))
+    except ValueError:
+        raise APIException('"limit" must be an integer', status_code=400)
+    if limit < 1 or limit > MAX_TOP_SIZE:
+        raise APIException(f'"limit" must be between 1 and {MAX_TOP_SIZE}', status_code=400)
+    return limit
+
+# LOS MAS FAVORITOS (/characters/top?limit=10), DE MAS A MENOS FAVORITOS
+# RECORRE EL INDICE ix_favorite_count_top DESDE EL FINAL Y SE DETIENE EN limit FILAS
+def top_response(model):
+    kind = model.__tablename__
+    limit = get_top_limit(request.args)
+    fields = public_columns(model)
+    rows = db.session.query(*[getattr(model, name) for name in fields], FavoriteCount.favorites) \
+        .select_from(FavoriteCount).join(model, model.id == FavoriteCount.item_id) \
+        .filter(FavoriteCount.kind == kind, FavoriteCount.favorites > 0) \
+        .order_by(FavoriteCount.favorites.desc(), FavoriteCount.item_id.desc()) \
+        .limit(limit).all()
+    return jsonify(serialize_rows(row_serializer(fields + ['favorites']), rows)), 200
@@ -0,0 +1,195 @@
+import os
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request, jsonify, g, current_app
+
+API_KEY_HEADER = 'X-API-Key'
+# ESTOS ENDPOINTS NUNCA SE LIMITAN (MONITORIZACION)
+EXEMPT_ENDPOINTS = ('get_metrics', 'api.get_pool_stats', 'static')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+# "20/s", "600/m", "5/10" (5 CADA 10 SEGUNDOS) -> (CAPACIDAD, TOKENS POR SEGUNDO)
+# UN LIMITE DE 0 PETICIONES O UN PERIODO DE 0 SEGUNDOS ES UN ERROR DE CONFIGURACION
+def parse_limit(value):
+    count, _, period = value.strip().partition('/')
+    seconds = PERIODS[period] if period in PERIODS else float(period or 1)
+    if int(count) < 1 or seconds <= 0:
+        raise ValueError(f'invalid rate limit "{value.strip()}": expected "<requests>/<period>" with at least 1 request and a period > 0')
+    return int(count), int(count) / seconds
+
+def parse_limits(value):
+    limits = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, limit = item.split('=', 1)
+            limits[name.strip()] = parse_limit(limit)
+    return limits
+
+# INTERFAZ DEL ALMACEN DEL LIMITADOR
+# UN ALMACEN COMPARTIDO ENTRE WORKERS (POR EJEMPLO REDIS CON UN SCRIPT LUA) PUEDE USARSE
+# IMPLEMENTANDO ESTOS TRES METODOS DE FORMA ATOMICA
+class RateLimitStore:
+    # CUBETA DE TOKENS: DEVUELVE 0 SI LA PETICION PASA O LOS SEGUNDOS QUE HAY QUE ESPERAR
+    def take(self, key, capacity, rate):
+        raise NotImplementedError
+
+    # PETICIONES EN CURSO: DEVUELVE False SI YA HAY limit PETICIONES DE ESE CLIENTE
+    def acquire(self, key, limit):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+# ALMACEN EN MEMORIA DEL PROCESO (LIMITES POR WORKER)
+# SE GUARDAN COMO MAXIMO max_keys CUBETAS, LAS MENOS USADAS SE DESCARTAN (EQUIVALE A UNA CUBETA LLENA)
+# clock SE PUEDE SUSTITUIR POR UN RELOJ FALSO PARA PROBARLO SIN ESPERAR
+class MemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def acquire(self, key, limit):
+        with self._lock:
+            current = self._in_flight.get(key, 0)
+            if current >= limit:
+                return False
+            self._in_flight[key] = current + 1
+            return True
+
+    def release(self, key):
+        with self._lock:
+            current = self._in_flight.get(key, 0) - 1
+            if current > 0:
+                self._in_flight[key] = current
+            else:
+                self._in_flight.pop(key, None)
+
+# LIMITADOR: UNA CUBETA POR CLIENTE (API KEY O IP) Y RUTA, MAS UN MAXIMO DE PETICIONES
+# SIMULTANEAS POR CLIENTE. SE COMPRUEBA EN before_request, ANTES DE TOCAR LA BASE DE DATOS
+class RateLimiter:
+    def __init__(self, store=None):
+        self.store = store or MemoryRateLimitStore()
+        self.enabled = False
+        self.default = parse_limit('20/s')
+        self.routes = {}
+        self.api_keys = {}
+        self.concurrency = 0
+        self.trust_proxy = False
+
+    def configure_from_env(self):
+        self.enabled = os.getenv('RATE_LIMIT_ENABLED', '0') not in ('0', 'false')
+        self.default = parse_limit(os.getenv('RATE_LIMIT_DEFAULT', '20/s'))
+        self.routes = parse_limits(os.getenv('RATE_LIMIT_ROUTES'))
+        self.api_keys = {hash_api_key(key): limit for key, limit in parse_limits(os.getenv('RATE_LIMIT_API_KEYS')).items()}
+        self.concurrency = int(os.getenv('RATE_LIMIT_CONCURRENCY', 0))
+        self.trust_proxy = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') not in ('0', 'false')
+
+    # LIMITE DE UNA RUTA EN EL CODIGO: @rate_limiter.limit('5/s'); RATE_LIMIT_ROUTES TIENE PRIORIDAD
+    def limit(self, value):
+        def decorator(view):
+            view.rate_limit = parse_limit(value)
+            return view
+        return decorator
+
+    # SOLO LAS API KEYS CONFIGURADAS (RATE_LIMIT_API_KEYS) TIENEN CUBETA PROPIA; CON UNA CLAVE
+    # DESCONOCIDA SE USA LA DE LA IP, ASI UNA CLAVE NUEVA EN CADA PETICION NO SALTA EL LIMITE
+    def client_id(self, api_key, remote_addr):
+        if api_key:
+            key = hash_api_key(api_key)
+            if key in self.api_keys:
+                return 'key:' + key
+        return 'ip:' + (remote_addr or 'unknown')
+
+    # LA API KEY SUSTITUYE AL LIMITE POR DEFECTO, PERO LAS RUTAS CON LIMITE PROPIO (RATE_LIMIT_ROUTES
+    # O @rate_limiter.limit, COMO LAS ALTAS/BAJAS MASIVAS) NUNCA PERMITEN MAS QUE ESE LIMITE
+    def limit_for(self, client, endpoint, view):
+        route = self.routes.get(endpoint, getattr(view, 'rate_limit', None))
+        if client.startswith('key:'):
+            key = self.api_keys[client[4:]]
+            return key if route is None else min(key, route, key=lambda limit: limit[1])
+        return self.default if route is None else route
+
+    # DEVUELVE LOS SEGUNDOS DE ESPERA (0 SI LA PETICION PASA) Y SI SE OCUPO UN HUECO DE CONCURRENCIA
+    # EL HUECO DE CONCURRENCIA SE OCUPA ANTES DE GASTAR EL TOKEN: UNA PETICION RECHAZADA POR
+    # CONCURRENCIA NO CONSUME SU LIMITE, Y SI FALTA EL TOKEN EL HUECO SE LIBERA
+    def admit(self, client, endpoint, view):
+        capacity, rate = self.limit_for(client, endpoint, view)
+        acquired = False
+        if self.concurrency:
+            if not self.store.acquire(client, self.concurrency):
+                return 1, False
+            acquired = True
+        wait = self.store.take(f'{client}|{endpoint}', capacity, rate)
+        if wait:
+            if acquired:
+                self.store.release(client)
+            return wait, False
+        return 0, acquired
+
+    # DETRAS DE UN PROXY DE CONFIANZA (RATE_LIMIT_TRUST_PROXY) LA IP ES LA ULTIMA DE X-Forwarded-For,
+    # LA QUE AÑADIO EL PROXY; LAS ANTERIORES LAS ESCRIBE EL CLIENTE Y NO SIRVEN PARA IDENTIFICARLO
+    def client_addr(self, forwarded_for, remote_addr):
+        if self.trust_proxy and forwarded_for:
+            return forwarded_for.split(',')[-1].strip() or remote_addr
+        return remote_addr
+
+    def remote_addr(self):
+        return self.client_addr(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+    def check_request(self):
+        if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+            return None
+        client = self.client_id(request.headers.get(API_KEY_HEADER), self.remote_addr())
+        wait, acquired = self.admit(client, request.endpoint, current_app.view_functions.get(request.endpoint))
+        if wait:
+            return too_many_requests(wait)
+        if acquired:
+            g.rate_limit_client = client
+        return None
+
+    def release_request(self, error=None):
+        client = g.pop('rate_limit_client', None)
+        if client is not None:
+            self.store.release(client)
+
+    def init_app(self, app):
+        self.configure_from_env()
+        if self.enabled:
+            app.before_request(self.check_request)
+            app.teardown_request(self.release_request)
+
+def hash_api_key(key):
+    return hashlib.sha1(key.strip().encode()).hexdigest()
+
+def retry_after(wait):
+    return str(max(1, math.ceil(wait)))
+
+def too_many_requests(wait):
+    response = jsonify({'message': 'too many requests'})
+    response.status_code = 429
+    response.headers['Retry-After'] = retry_after(wait)
+    return response
+
+rate_limiter = RateLimiter()
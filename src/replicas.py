@@ -0,0 +1,64 @@
+import os
+import time
+import itertools
+from flask import g, request, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+from pool import engine_options_from_env
+
+REPLICA_BIND_PREFIX = 'replica_'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_COOKIE = 'db_primary_until'
+
+# DATABASE_REPLICA_URLS=postgresql://...@replica1/db,postgresql://...@replica2/db
+def replica_urls_from_env():
+    urls = os.getenv('DATABASE_REPLICA_URLS', '')
+    return [url.strip().replace("postgres://", "postgresql://") for url in urls.split(',') if url.strip()]
+
+# SESION QUE ENVIA LAS LECTURAS A LA REPLICA ELEGIDA PARA LA PETICION (g.db_bind)
+# LOS INSERT/UPDATE/DELETE Y LOS flush DEL ORM SIEMPRE VAN A LA PRINCIPAL
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        key = g.get('db_bind') if has_app_context() else None
+        if bind is None and key is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# REPARTE LAS PETICIONES GET ENTRE LAS REPLICAS (ROUND-ROBIN)
+# LEER LO QUE SE ACABA DE ESCRIBIR: DESPUES DE UNA ESCRITURA, DURANTE DATABASE_REPLICA_LAG
+# SEGUNDOS, LAS LECTURAS DE ESE CLIENTE (COOKIE) VAN A LA PRINCIPAL; LAS DE LOS DEMAS SIGUEN EN
+# LAS REPLICAS (LA CACHE DE RESPUESTAS USA LAS VERSIONES LEIDAS DE LA MISMA REPLICA QUE LOS DATOS)
+class ReplicaRouter:
+    def __init__(self):
+        self.keys = []
+        self.lag = 5.0
+        self._next = itertools.count()
+
+    def init_app(self, app):
+        urls = replica_urls_from_env()
+        self.keys = [f'{REPLICA_BIND_PREFIX}{index}' for index in range(len(urls))]
+        self.lag = float(os.getenv('DATABASE_REPLICA_LAG', 5))
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        for key, url in zip(self.keys, urls):
+            binds[key] = {"url": url, **engine_options_from_env(url)}
+        if self.keys:
+            app.before_request(self.choose_bind)
+            app.after_request(self.remember_write)
+
+    def wants_primary(self):
+        if request.method not in READ_METHODS:
+            return True
+        try:
+            return time.time() < float(request.cookies.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            return False
+
+    def choose_bind(self):
+        g.db_bind = None if self.wants_primary() else self.keys[next(self._next) % len(self.keys)]
+
+    def remember_write(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            response.set_cookie(PRIMARY_COOKIE, str(time.time() + self.lag), max_age=int(self.lag) + 1, httponly=True)
+        return response
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,120 @@
+import re
+import weakref
+from flask import request, jsonify
+from sqlalchemy import event, text, DDL
+from models import db
+from utils import APIException
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+SEARCH_CANDIDATES = 500
+# EL rowid DEL INDICE SE CALCULA COMO id * 4 + TIPO, ASI BORRAR O ACTUALIZAR UNA
+# ENTRADA ES UNA BUSQUEDA POR CLAVE Y NO UN RECORRIDO DEL INDICE
+SEARCH_KINDS = {'character': 1, 'planet': 2, 'vehicle': 3}
+
+# INDICE DE TEXTO COMPLETO PARA SQLITE (FTS5)
+# LOS TRIGGERS LO MANTIENEN EN LA MISMA TRANSACCION QUE CADA INSERT/UPDATE/DELETE, ASI
+# QUEDA AL DIA CON LOS POST/DELETE (SIMPLES Y MASIVOS), EL ADMIN Y LOS BORRADOS EN CASCADA
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_search USING fts5("
+    "name, kind UNINDEXED, ref_id UNINDEXED, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+]
+for _kind, _code in SEARCH_KINDS.items():
+    SQLITE_SEARCH_DDL += [
+        f"CREATE TRIGGER IF NOT EXISTS catalog_search_{_kind}_insert AFTER INSERT ON {_kind} BEGIN "
+        f"INSERT INTO catalog_search(rowid, name, kind, ref_id) VALUES (new.id * 4 + {_code}, new.name, '{_kind}', new.id); END",
+        f"CREATE TRIGGER IF NOT EXISTS catalog_search_{_kind}_update AFTER UPDATE OF name ON {_kind} BEGIN "
+        f"UPDATE catalog_search SET name = new.name WHERE rowid = old.id * 4 + {_code}; END",
+        f"CREATE TRIGGER IF NOT EXISTS catalog_search_{_kind}_delete AFTER DELETE ON {_kind} BEGIN "
+        f"DELETE FROM catalog_search WHERE rowid = old.id * 4 + {_code}; END",
+    ]
+
+# LAS BASES CREADAS CON db.create_all() TAMBIEN TIENEN EL INDICE
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+# SE COMPRUEBA UNA VEZ POR ENGINE, NO EN CADA BUSQUEDA
+_fts_engines = weakref.WeakKeyDictionary()
+
+def has_fts_index():
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return False
+    if bind not in _fts_engines:
+        row = db.session.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_search'")).first()
+        _fts_engines[bind] = row is not None
+    return _fts_engines[bind]
+
+def tokenize(q):
+    return re.findall(r'\w+', q.lower())
+
+# SQLITE: CADA PALABRA COMO PREFIJO ("luk"* "sky"*)
+# PARA QUE EL COSTE NO DEPENDA DE CUANTAS FILAS COINCIDEN (UN PREFIJO DE DOS LETRAS PUEDE
+# COINCIDIR CON MEDIO MILLON) SE TOMAN COMO MAXIMO SEARCH_CANDIDATES COINCIDENCIAS DEL
+# INDICE, LAS MEJORES POR bm25, MAS OTRAS TANTAS DE LAS QUE EMPIEZAN POR LA PRIMERA PALABRA
+# (^"luk"*), Y SOLO ESAS SE ORDENAN: PRIMERO LOS NOMBRES QUE EMPIEZAN POR q, DESPUES bm25
+def search_fts(q, kinds, limit):
+    tokens = [f'"{token}"*' for token in tokenize(q)]
+    if not tokens:
+        return []
+    candidates = (
+        "SELECT rowid FROM (SELECT rowid FROM catalog_search "
+        "WHERE catalog_search MATCH {match} AND kind IN ({kinds}) ORDER BY rank LIMIT :candidates)"
+    )
+    kinds = ', '.join(f"'{kind}'" for kind in kinds)
+    rows = db.session.execute(text(
+        "SELECT kind, ref_id, name, rank FROM catalog_search "
+        "WHERE catalog_search MATCH :match AND rowid IN ({best} UNION {starting}) "
+        "ORDER BY (lower(name) LIKE :prefix ESCAPE '\\') DESC, rank, length(name) LIMIT :limit".format(
+            best=candidates.format(match=':match', kinds=kinds),
+            starting=candidates.format(match=':starting', kinds=kinds))
+    ), {"match": ' '.join(tokens), "starting": ' '.join(['^' + tokens[0]] + tokens[1:]),
+        "prefix": escape_like(q.lower()) + '%', "candidates": SEARCH_CANDIDATES, "limit": limit})
+    return [{"kind": kind, "id": ref_id, "name": name, "score": round(-rank, 6)} for kind, ref_id, name, rank in rows]
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+# POSTGRES (INDICES pg_trgm) Y CUALQUIER OTRA BASE: ILIKE '%q%' POR TABLA, PRIMERO LOS
+# NOMBRES QUE EMPIEZAN POR q Y DESPUES LOS MAS PARECIDOS
+def search_like(q, kinds, limit):
+    bind = db.session.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+    score = 'similarity(name, :q)' if postgres else '1.0 / length(name)'
+    like = 'ILIKE' if postgres else 'LIKE'
+    parts = [
+        f"SELECT * FROM (SELECT '{kind}' AS kind, id, name, "
+        f"CASE WHEN name {like} :prefix ESCAPE '\\' THEN 1 ELSE 0 END AS starts, {score} AS score "
+        f"FROM {bind.dialect.identifier_preparer.quote(kind)} WHERE name {like} :contains ESCAPE '\\' "
+        f"ORDER BY starts DESC, score DESC LIMIT :limit) AS {kind}_matches"
+        for kind in kinds
+    ]
+    rows = db.session.execute(text(
+        ' UNION ALL '.join(parts) + ' ORDER BY starts DESC, score DESC LIMIT :limit'
+    ), {"q": q, "prefix": escape_like(q) + '%', "contains": '%' + escape_like(q) + '%', "limit": limit})
+    return [{"kind": kind, "id": row_id, "name": name, "score": round(float(score), 6)} for kind, row_id, name, _, score in rows]
+
+def get_search_args(args):
+    q = args.get('q', '').strip()
+    if len(q) == 0:
+        raise APIException('"q" is required', status_code=400)
+    try:
+        limit = int(args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        raise APIException('"limit" must be an integer', status_code=400)
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise APIException(f'"limit" must be between 1 and {MAX_SEARCH_LIMIT}', status_code=400)
+    kinds = args.get('kind', ','.join(SEARCH_KINDS)).split(',')
+    for kind in kinds:
+        if kind not in SEARCH_KINDS:
+            raise APIException('"kind" must be any of: ' + ', '.join(SEARCH_KINDS), status_code=400)
+    return q, kinds, limit
+
+# BUSQUEDA POR NOMBRE EN PERSONAJES, PLANETAS Y VEHICULOS (?q=luk&kind=character,planet&limit=10)
+def search_response():
+    q, kinds, limit = get_search_args(request.args)
+    if has_fts_index():
+        results = search_fts(q, kinds, limit)
+    else:
+        results = search_like(q, kinds, limit)
+    return jsonify({"q": q, "results": results}), 200
@@ -0,0 +1,60 @@
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from metrics import timed_serialize
+
+try:
+    import orjson
+except ImportError:  # orjson ES OPCIONAL (pipenv install orjson), SIN EL SE USA EL json DE LA LIBRERIA ESTANDAR
+    orjson = None
+
+# CONVIERTE LAS FILAS DE UNA CONSULTA DE COLUMNAS (TUPLAS) EN DICCIONARIOS
+# SIN CREAR OBJETOS DEL ORM NI PASAR POR EL IDENTITY MAP
+def row_serializer(names):
+    names = tuple(names)
+    return lambda row: dict(zip(names, row))
+
+@timed_serialize
+def serialize_rows(serialize, rows):
+    return [serialize(row) for row in rows]
+
+# PROVEEDOR JSON DE LA APP: orjson CUANDO ESTA INSTALADO, stdlib SI NO
+# LAS FECHAS SE SIGUEN CODIFICANDO COMO EN FLASK ("Wed, 31 Jul 2024 00:00:00 GMT")
+# PARA QUE LA RESPUESTA SEA LA MISMA CON CUALQUIERA DE LOS DOS
+class FastJSONProvider(DefaultJSONProvider):
+    backend = 'orjson' if orjson is not None else 'json'
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return http_date(o)
+        return DefaultJSONProvider.default(o)
+
+    def options(self):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options()) + b'\n',
+            mimetype=self.mimetype,
+        )
+
+def init_json(app):
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,229 @@
+import os
+import json
+import mmap
+import fcntl
+import hashlib
+import struct
+import tempfile
+import threading
+from flask import g, current_app
+from models import db, Character, Planet, Vehicle, TableVersion
+
+MAGIC = b'SWCAT1\n'
+HEADER_LENGTH = struct.Struct('<I')
+# UNA ENTRADA DEL INDICE POR FILA, ORDENADAS POR id: (id, POSICION, LONGITUD)
+INDEX_ENTRY = struct.Struct('<qQI')
+CATALOG_MODELS = (Character, Planet, Vehicle)
+CATALOG_TABLES = tuple(model.__tablename__ for model in CATALOG_MODELS)
+
+# ARCHIVO CON EL CATALOGO (PERSONAJES, PLANETAS Y VEHICULOS) YA CODIFICADO EN JSON
+#
+#   MAGIC | LONGITUD DE LA CABECERA | CABECERA (JSON) | POR TABLA: INDICE + DATOS
+#
+# LA CABECERA GUARDA LAS VERSIONES DE LAS TABLAS, EL NUMERO DE FILAS Y DONDE EMPIEZA CADA
+# INDICE (LAS POSICIONES CUENTAN DESDE EL FINAL DE LA CABECERA). LOS DATOS SON LAS FILAS
+# EN JSON, EN ORDEN DE id Y SEPARADAS POR COMAS, ASI EL LISTADO COMPLETO ES "[" + BLOQUE + "]"
+# Y UNA PAGINA ES UN TROZO CONTIGUO DEL BLOQUE, SIN DECODIFICAR NI VOLVER A CODIFICAR NADA
+class Snapshot:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        (length,) = HEADER_LENGTH.unpack_from(self.buffer, len(MAGIC))
+        start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(self.buffer[start:start + length])
+        self.base = start + length
+        self.versions = header['versions']
+        self.tables = header['tables']
+
+    def is_current(self, table, version):
+        return self.versions.get(table) == version
+
+    def entry(self, table, position):
+        return INDEX_ENTRY.unpack_from(self.buffer, self.base + self.tables[table]['index'] + position * INDEX_ENTRY.size)
+
+    # BUSQUEDA BINARIA EN EL INDICE: POSICION DEL PRIMER id MAYOR QUE item_id
+    def bisect(self, table, item_id):
+        low, high = 0, self.tables[table]['count']
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(table, middle)[0] <= item_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, table, item_id):
+        position = self.bisect(table, item_id) - 1
+        if position < 0:
+            return None
+        found_id, offset, length = self.entry(table, position)
+        if found_id != item_id:
+            return None
+        return self.buffer[self.base + offset:self.base + offset + length]
+
+    # FILAS [start, stop) COMO UN SOLO TROZO "fila,fila,fila"
+    def rows(self, table, start, stop):
+        if start >= stop:
+            return b''
+        _, first, _ = self.entry(table, start)
+        _, last, length = self.entry(table, stop - 1)
+        return self.buffer[self.base + first:self.base + last + length]
+
+    def count(self, table):
+        return self.tables[table]['count']
+
+    def last_id(self, table, position):
+        return self.entry(table, position)[0]
+
+# ESCRIBE EL ARCHIVO EN UN TEMPORAL DEL MISMO DIRECTORIO Y LO CAMBIA DE GOLPE (os.replace):
+# LOS WORKERS QUE YA TIENEN MAPEADO EL ANTERIOR LO SIGUEN LEYENDO HASTA QUE LO SUELTAN
+# LAS VERSIONES SE LEEN ANTES QUE LAS FILAS: SI ENTRE MEDIAS HAY UNA ESCRITURA, EL ARCHIVO
+# QUEDA MARCADO CON LA VERSION ANTERIOR Y SE VUELVE A GENERAR (NUNCA AL REVES)
+def write_snapshot(path):
+    versions = dict(TableVersion.get_versions(*CATALOG_TABLES))
+    dumps = current_app.json.dumps
+    header = {"versions": versions, "tables": {}}
+    body = []
+    position = 0
+    for model in CATALOG_MODELS:
+        names = [column.name for column in model.__table__.columns]
+        query = db.session.query(*[getattr(model, name) for name in names]).order_by(model.id)
+        rows = [(row.id, dumps(dict(zip(names, row))).encode()) for row in query]
+        header["tables"][model.__tablename__] = {"count": len(rows), "index": position}
+        offset = position + INDEX_ENTRY.size * len(rows)
+        for item_id, data in rows:
+            body.append(INDEX_ENTRY.pack(item_id, offset, len(data)))
+            offset += len(data) + 1
+        data = b','.join(data for _, data in rows)
+        body.append(data)
+        position += INDEX_ENTRY.size * len(rows) + len(data)
+    encoded = json.dumps(header).encode()
+
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.catalog-', delete=False) as file:
+        try:
+            file.write(MAGIC + HEADER_LENGTH.pack(len(encoded)) + encoded)
+            file.writelines(body)
+        except Exception:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+
+# CATALOGO COMPARTIDO ENTRE LOS WORKERS (CATALOG_SNAPSHOT=1)
+# CADA WORKER MAPEA EL MISMO ARCHIVO EN MODO LECTURA: LAS PAGINAS ESTAN UNA SOLA VEZ EN LA
+# MEMORIA DEL SISTEMA (PAGE CACHE) SIN IMPORTAR CUANTOS WORKERS HAYA
+# EL ARCHIVO SE REGENERA EN UN HILO EN SEGUNDO PLANO: DESPUES DE UNA ESCRITURA EN EL CATALOGO
+# (commit_changes) O CUANDO UNA LECTURA LO ENCUENTRA ATRASADO (EL ADMIN, OTRO PROCESO). NI LA
+# ESCRITURA NI LA LECTURA ESPERAN: MIENTRAS TANTO LAS LECTURAS VAN A LA BASE. VARIAS PETICIONES
+# SEGUIDAS SOLO PROVOCAN UNA O DOS REGENERACIONES, Y UN ERROR AL REGENERAR SOLO SE REGISTRA
+class CatalogSnapshot:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._pending = False
+        self._worker = None
+
+    # LA RUTA POR DEFECTO LLEVA UN HASH DE LA URL DE LA BASE: DOS APPS CON BASES DISTINTAS EN LA
+    # MISMA MAQUINA NO COMPARTEN (NI SE PISAN) EL ARCHIVO
+    def configure_from_env(self, database_url=''):
+        self.enabled = os.getenv('CATALOG_SNAPSHOT', '0') not in ('0', 'false')
+        digest = hashlib.sha1(database_url.encode()).hexdigest()[:12]
+        self.path = os.getenv('CATALOG_SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), f'starwars-catalog-{digest}.snapshot'))
+
+    def init_app(self, app):
+        self.configure_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    # VUELVE A MAPEAR EL ARCHIVO SI OTRO WORKER LO HA CAMBIADO
+    def load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._snapshot is None or self._snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+                self._snapshot = Snapshot(self.path)
+            return self._snapshot
+
+    # UN SOLO PROCESO GENERA EL ARCHIVO A LA VEZ (flock); CON wait=False, SI OTRO LO ESTA
+    # GENERANDO NO SE ESPERA Y DEVUELVE False. SE LLAMA DESDE EL HILO (schedule_rebuild)
+    # O DIRECTAMENTE PARA GENERARLO AL ARRANCAR
+    def rebuild(self, wait=True):
+        with open(self.path + '.lock', 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return False
+            try:
+                write_snapshot(self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return True
+
+    # PIDE UNA REGENERACION; SI EL HILO YA ESTA TRABAJANDO, LA HARA AL TERMINAR LA ACTUAL
+    def schedule_rebuild(self):
+        with self._lock:
+            self._pending = True
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self.rebuild_in_background, args=(current_app._get_current_object(),),
+                                            name='catalog-snapshot', daemon=True)
+            self._worker.start()
+
+    def rebuild_in_background(self, app):
+        with app.app_context():
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._worker = None
+                        return
+                    self._pending = False
+                try:
+                    self.rebuild()
+                    self.load()
+                except Exception:
+                    app.logger.exception('catalog snapshot rebuild failed')
+                finally:
+                    db.session.remove()
+
+    # EL ARCHIVO SOLO SE USA SI TIENE LA VERSION ACTUAL DE LA TABLA; LA VERSION SE TOMA DE LA
+    # QUE YA CONSULTO @conditional (g.table_versions) PARA NO HACER OTRA CONSULTA
+    # CUALQUIER OTRA VERSION LO REGENERA, TAMBIEN UNA POSTERIOR A LA DE LA BASE (UN ARCHIVO DE
+    # OTRA BASE O DE UNA BASE QUE SE HA VUELTO A CREAR)
+    def current(self, table):
+        if not self.enabled:
+            return None
+        version = g.get('table_versions', {}).get(table)
+        if version is None:
+            version = dict(TableVersion.get_versions(table))[table]
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.is_current(table, version):
+            return snapshot
+        snapshot = self.load()
+        if snapshot is None or not snapshot.is_current(table, version):
+            self.schedule_rebuild()
+            return None
+        return snapshot
+
+    def refresh(self, *tables):
+        if self.enabled and set(tables) & set(CATALOG_TABLES):
+            self.schedule_rebuild()
+
+    # GET /character/<id> DESDE EL ARCHIVO; None SI HAY QUE IR A LA BASE
+    def item_response(self, model, item_id, not_found_message):
+        snapshot = self.current(model.__tablename__)
+        if snapshot is None:
+            return None
+        data = snapshot.get(model.__tablename__, item_id)
+        if data is None:
+            return current_app.json.response(not_found_message), 404
+        return json_bytes_response(data)
+
+def json_bytes_response(data):
+    return current_app.response_class(data + b'\n', mimetype='application/json')
+
+catalog_snapshot = CatalogSnapshot()
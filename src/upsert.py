@@ -0,0 +1,70 @@
+from sqlalchemy import insert, update, bindparam, exc
+from sqlalchemy.dialects import sqlite, postgresql
+from models import db, Favorite, FavoriteCount
+
+DIALECT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# INSERT ... ON CONFLICT (columnas) DO NOTHING EN UNA SOLA SENTENCIA
+# EVITA EL "SELECT Y DESPUES INSERT" (UNA CONSULTA MENOS Y SIN CARRERAS ENTRE PETICIONES
+# CONCURRENTES: LA BASE DECIDE QUIEN INSERTA). DEVUELVE EL id INSERTADO O None SI YA EXISTIA
+# where ES LA CONDICION DEL INDICE UNICO PARCIAL (FAVORITOS)
+def insert_ignore(model, values, conflict_columns, where=None):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in DIALECT_INSERTS:
+        statement = DIALECT_INSERTS[dialect](model).values(**values) \
+            .on_conflict_do_nothing(index_elements=conflict_columns, index_where=where)
+        result = db.session.execute(statement)
+        if result.rowcount == 0:
+            return None
+        return result.inserted_primary_key[0]
+
+    # OTRAS BASES: INSERT NORMAL DENTRO DE UN SAVEPOINT
+    try:
+        with db.session.begin_nested():
+            result = db.session.execute(insert(model).values(**values))
+    except exc.IntegrityError:
+        return None
+    return result.inserted_primary_key[0]
+
+# FAVORITO NUEVO; EL CONFLICTO LO DETECTA EL INDICE UNICO PARCIAL DE ESE TIPO
+# (uq_favorite_user_character, uq_favorite_user_planet O uq_favorite_user_vehicle)
+def insert_favorite(user_id, column, item_id):
+    return insert_ignore(Favorite, {"user_id": user_id, column: item_id}, ['user_id', column],
+                         where=db.text(f'{column} IS NOT NULL'))
+
+# SUMA deltas {(kind, id): n} A LOS CONTADORES DE FAVORITOS
+# LOS AUMENTOS SON UN SOLO INSERT ... ON CONFLICT (kind, item_id) DO UPDATE (executemany): SI DOS
+# PETICIONES AÑADEN A LA VEZ EL PRIMER FAVORITO DE UN ELEMENTO, LA BASE SUMA LAS DOS SIN CONFLICTO
+# LAS RESTAS SOLO ACTUALIZAN (EL CONTADOR YA EXISTE SI EXISTIA EL FAVORITO)
+def add_favorite_counts(deltas):
+    table = FavoriteCount.__table__
+    increments = [{"kind": kind, "item_id": item_id, "favorites": delta} for (kind, item_id), delta in deltas.items() if delta > 0]
+    decrements = [{"k": kind, "i": item_id, "d": delta} for (kind, item_id), delta in deltas.items() if delta < 0]
+    add_delta = update(table).where(table.c.kind == bindparam('k'), table.c.item_id == bindparam('i')) \
+        .values(favorites=table.c.favorites + bindparam('d'))
+    if decrements:
+        db.session.execute(add_delta, decrements)
+    if not increments:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in DIALECT_INSERTS:
+        statement = DIALECT_INSERTS[dialect](table)
+        statement = statement.on_conflict_do_update(index_elements=['kind', 'item_id'],
+                                                    set_={"favorites": table.c.favorites + statement.excluded.favorites})
+        db.session.execute(statement, increments)
+        return
+
+    # OTRAS BASES: UPDATE Y, SI NO EXISTE, INSERT EN UN SAVEPOINT; SI OTRA PETICION LO CREO ANTES, UPDATE
+    for row in increments:
+        values = {"k": row["kind"], "i": row["item_id"], "d": row["favorites"]}
+        if db.session.execute(add_delta, values).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table).values(**row))
+        except exc.IntegrityError:
+            db.session.execute(add_delta, values)
+
+def add_favorite_count(kind, item_id, delta=1):
+    add_favorite_counts({(kind, item_id): delta})
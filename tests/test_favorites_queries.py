@@ -0,0 +1,66 @@
+import os
+import sys
+from datetime import date
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from app import create_app  # noqa: E402
+from models import db, User, Character, Planet, Vehicle, Favorite  # noqa: E402
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    app = create_app(features=())
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def add_user_with_favorites(n):
+    user = User(name='n', last_name='l', email=f'user{n}@example.com', password='p', subscription_date=date.today())
+    db.session.add(user)
+    for i in range(n):
+        character = Character(name=f'c{n}-{i}', birth_year='1', gender='male', height='1', eye_color='blue', skin_color='x', image='i')
+        planet = Planet(name=f'p{n}-{i}', climate='arid', population='1', orbital_period='1', rotation_period='1', diameter='1', image='i')
+        vehicle = Vehicle(name=f'v{n}-{i}', model='m', size='1')
+        db.session.add_all([character, planet, vehicle])
+        db.session.flush()
+        db.session.add_all([
+            Favorite(user_id=user.id, character_id=character.id),
+            Favorite(user_id=user.id, planet_id=planet.id),
+            Favorite(user_id=user.id, vehicle_id=vehicle.id),
+        ])
+    db.session.commit()
+    return user.id
+
+def count_queries(app, path):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = app.test_client().get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+# EL NUMERO DE CONSULTAS DE GET /favorites/user/<id> NO DEPENDE DEL NUMERO DE FAVORITOS
+def test_user_favorites_query_count_is_flat(app):
+    n = 5
+    with app.app_context():
+        few = add_user_with_favorites(n)
+        many = add_user_with_favorites(10 * n)
+
+    few_queries, few_body = count_queries(app, f'/favorites/user/{few}')
+    many_queries, many_body = count_queries(app, f'/favorites/user/{many}')
+
+    assert len(few_body['favorites']) == 3 * n
+    assert len(many_body['favorites']) == 30 * n
+    assert all(favorite['name'] for favorite in many_body['favorites'])
+    assert few_queries == many_queries